@@ -2,7 +2,6 @@ import argparse
 from transcript_parser.parser import parse_srt
 from transcript_parser.chunker import chunk_subtitles
 from llm.formatter import format_chunk_for_prompt
-from llm.analyzer import analyze_for_viral_content
 
 def main():
     parser = argparse.ArgumentParser(
@@ -44,9 +43,36 @@ def main():
         default=None,
         help="Output file path (default: print to console)"
     )
+    parser.add_argument(
+        "--pack",
+        type=int,
+        default=1,
+        help="Number of chunks packed into each LLM request (default: 1)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore cached LLM responses and re-query the model"
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Submit all chunks as one Gemini batch job (cheaper, but results can take minutes to hours)"
+    )
+    parser.add_argument(
+        "-v", "--verbose",
+        action="count",
+        default=0,
+        help="Also print the raw LLM response for each request"
+    )
     
     args = parser.parse_args()
     
+    # Deferred so --help and argument errors don't pay for importing the Gemini SDK
+    from config import ensure_dirs
+    from llm.analyzer import find_viral_clips, format_final_results, write_final_results
+    ensure_dirs()
+    
     # Parse SRT file
     print(f"Parsing SRT file: {args.srt_file}")
     subtitles = parse_srt(args.srt_file)
@@ -69,18 +95,24 @@ def main():
     
     # # Analyze for viral content
     print("\nAnalyzing for viral content...")
-    results = analyze_for_viral_content(chunks, output_format=args.format)
+    clips = find_viral_clips(
+        chunks,
+        verbose=1 + args.verbose,
+        batch=args.batch,
+        chunks_per_prompt=args.pack,
+        use_cache=not args.no_cache
+    )
     
     # Output results
     if args.output:
-        with open(args.output, 'a', encoding='utf-8') as f:
-            f.write(results)
+        with open(args.output, 'w', encoding='utf-8', newline='') as f:
+            write_final_results(clips, f, args.format)
         print(f"\nResults saved to: {args.output}")
     else:
         print("\n" + "=" * 50)
         print("VIRAL CONTENT CANDIDATES")
         print("=" * 50)
-        print(results)
+        print(format_final_results(clips, args.format))
 
 
 if __name__ == "__main__":
@@ -1,196 +1,448 @@
 import os
-from google import genai
-from .prompts import VIRALITY_DETECTION_PROMPT
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from .prompts import VIRALITY_DETECTION_PROMPT, VIRALITY_DETECTION_PREFIX, MULTI_TRANSCRIPT_PROMPT
 from .formatter import format_chunk_for_prompt
+from .cache import get_cached_response, save_cached_response
+from utils.json_utils import json_loads, json_dumps
 import json, io, csv
 
 
+class RateLimiter:
+    """Thread-safe limiter spacing calls to stay under a requests-per-minute budget"""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+MODEL = "gemini-2.5-flash-lite"
+BATCH_POLL_SECONDS = int(os.getenv("LLM_BATCH_POLL_SECONDS", "30"))
+PROMPT_CACHE_ENABLED = os.getenv("LLM_PROMPT_CACHE", "1") != "0"
+PROMPT_CACHE_TTL = os.getenv("LLM_PROMPT_CACHE_TTL", "600s")
+BATCH_DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+_rate_limiter = RateLimiter(int(os.getenv("LLM_RPM", "60")))
+
+# One client per process so every request shares its keep-alive connection pool
+_client = None
+_client_lock = threading.Lock()
+
+# The prompt is invariant, so split it around the transcript slot once
+_PROMPT_PREFIX, _PROMPT_SUFFIX = VIRALITY_DETECTION_PROMPT.split("<transcript>", 1)
+
+_FENCE_RE = re.compile(r"^\s*```(?:json)?|```\s*$")
+# HH:MM:SS[,mmm] or MM:SS[,mmm]
+_TIMESTAMP_RE = re.compile(r"\s*(?:(\d+):)?(\d+):(\d+(?:[.,]\d*)?)\s*")
+
+
 def get_client():
-    """Initialize OpenAI client"""
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY environment variable not set")
-    return genai.Client()
+    """Return the shared GenAI client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                api_key = os.getenv("GEMINI_API_KEY")
+                if not api_key:
+                    raise ValueError("GEMINI_API_KEY environment variable not set")
+                from google import genai
+                _client = genai.Client()
+    return _client
+
+
+def _strip_code_fences(text):
+    """Strip a surrounding ```json ... ``` markdown fence from an LLM response"""
+    return _FENCE_RE.sub("", text)
+
+
+def _parse_response(result):
+    """
+    Parse a raw LLM response once into a result dict.
+    
+    Returns:
+        The decoded dict, or {"clips": [], "error": ...} if it isn't valid JSON
+    """
+    try:
+        data = json_loads(_strip_code_fences(result))
+    except json.JSONDecodeError as e:
+        return {"clips": [], "error": f"invalid JSON response ({e})"}
+    if not isinstance(data, dict):
+        return {"clips": [], "error": "invalid JSON response (expected an object)"}
+    return data
+
+
+def _is_cacheable(result):
+    """Whether a raw response is worth caching: non-empty and valid JSON"""
+    return bool(result) and not _parse_response(result).get("error")
 
 
 def get_analysis_prompt(chunk_text, chunk_index, total_chunks):
     """Generate the analysis prompt for a chunk"""
-    prompt = VIRALITY_DETECTION_PROMPT.replace("<transcript>", chunk_text)
-    return prompt
+    return _PROMPT_PREFIX + chunk_text + _PROMPT_SUFFIX
 
-def analyze_chunk(client, chunk, chunk_index, total_chunks):
-    """Analyze a single chunk for viral content"""
-    model = "gemini-2.5-flash-lite"
-    max_tokens = int(os.getenv("LLM_MAX_TOKENS", "2000"))
-    
-    chunk_text = format_chunk_for_prompt(chunk)
-    prompt = get_analysis_prompt(chunk_text, chunk_index, total_chunks)
+
+def pack_chunks(chunks, chunks_per_prompt):
+    """
+    Pack consecutive chunks into multi-transcript prompt bodies.
+
+    Each chunk is wrapped in <transcript id='k'> tags, where k is its 1-based
+    position in `chunks`, so clips can be mapped back via "source_chunk".
+
+    Returns:
+        List of (packed_text, chunk_count) tuples
+    """
+    packed = []
+    for start in range(0, len(chunks), chunks_per_prompt):
+        group = chunks[start:start + chunks_per_prompt]
+        text = "\n\n".join(
+            f"<transcript id='{start + offset}'>\n{format_chunk_for_prompt(chunk)}\n</transcript>"
+            for offset, chunk in enumerate(group, 1)
+        )
+        packed.append((text, len(group)))
+    return packed
+
+
+def get_packed_prompt(packed_text, chunk_count):
+    """Generate the analysis prompt for several packed chunks"""
+    return (MULTI_TRANSCRIPT_PROMPT
+            .replace("<count>", str(chunk_count))
+            .replace("<transcripts>", packed_text))
+
+
+def build_prompts(chunks, chunks_per_prompt=1):
+    """Build one prompt per chunk, or one per group of packed chunks"""
+    total_chunks = len(chunks)
+    if chunks_per_prompt <= 1:
+        return [
+            get_analysis_prompt(format_chunk_for_prompt(chunk), i, total_chunks)
+            for i, chunk in enumerate(chunks, 1)
+        ]
+    return [
+        get_packed_prompt(text, count)
+        for text, count in pack_chunks(chunks, chunks_per_prompt)
+    ]
+
+
+def create_prompt_cache(client):
+    """
+    Cache the static prompt prefix server-side (Gemini context caching).
+
+    Returns:
+        Cached content name, or None if caching is unavailable (e.g. the
+        prefix is below the model's minimum cacheable size)
+    """
+    from google.genai import types
     
+    try:
+        cache = client.caches.create(
+            model=MODEL,
+            config=types.CreateCachedContentConfig(
+                display_name="clipper-virality-prompt",
+                contents=[VIRALITY_DETECTION_PREFIX],
+                ttl=PROMPT_CACHE_TTL,
+            )
+        )
+        return cache.name
+    except Exception as e:
+        print(f"  Prompt caching unavailable, sending full prompts: {e}")
+        return None
+
+
+def delete_prompt_cache(client, cache_name):
+    """Delete a cached prompt prefix created by create_prompt_cache"""
+    try:
+        client.caches.delete(name=cache_name)
+    except Exception as e:
+        print(f"  Warning: failed to delete prompt cache {cache_name}: {e}")
+
+
+def analyze_prompt(client, prompt, use_cache=True, cached_content=None):
+    """
+    Send a single analysis prompt to Gemini and return the raw response text.
+
+    Successful responses are always written to the on-disk cache; use_cache=False
+    only skips the lookup, so a forced re-run refreshes stale entries.
+    When `cached_content` names a server-side cache of VIRALITY_DETECTION_PREFIX,
+    only the transcript part of the prompt is sent.
+    """
+    if use_cache:
+        cached = get_cached_response(MODEL, prompt)
+        if cached is not None:
+            return cached
+    
+    contents = prompt
+    config = None
+    if cached_content and prompt.startswith(VIRALITY_DETECTION_PREFIX):
+        from google.genai import types
+        contents = prompt[len(VIRALITY_DETECTION_PREFIX):]
+        config = types.GenerateContentConfig(cached_content=cached_content)
+    
+    _rate_limiter.wait()
     try:
         response = client.models.generate_content(
-            model=model, contents=prompt
+            model=MODEL, contents=contents, config=config
         )
-        return response.text
     except Exception as e:
-        return json.dumps({"clips": [], "error": str(e)})
+        return json_dumps({"clips": [], "error": str(e)})
+    
+    # Blocked or safety-filtered responses have no text
+    if not response.text:
+        return json_dumps({"clips": [], "error": "Empty response"})
+    if _is_cacheable(response.text):
+        save_cached_response(MODEL, prompt, response.text)
+    return response.text
+
+
+def analyze_chunk(client, chunk, chunk_index, total_chunks, use_cache=True):
+    """Analyze a single chunk for viral content"""
+    chunk_text = format_chunk_for_prompt(chunk)
+    prompt = get_analysis_prompt(chunk_text, chunk_index, total_chunks)
+    return analyze_prompt(client, prompt, use_cache)
 
 
-def parse_analysis_results(raw_results):
-    """Parse raw LLM JSON results into unified clip list"""
+def analyze_batch(client, prompts, verbose=True):
+    """
+    Analyze all prompts in a single Gemini batch job (billed at the batch rate).
+
+    Args:
+        client: GenAI client
+        prompts: List of analysis prompts (see build_prompts)
+        verbose: Print progress updates
+
+    Returns:
+        List of raw LLM responses, in prompt order
+    """
+    from google.genai import types
+
+    total_prompts = len(prompts)
+
+    # One JSONL request per prompt, keyed so results can be restored in order
+    with tempfile.NamedTemporaryFile("w", suffix=".jsonl", encoding="utf-8", delete=False) as f:
+        for i, prompt in enumerate(prompts, 1):
+            request = {"contents": [{"parts": [{"text": prompt}], "role": "user"}]}
+            f.write(json_dumps({"key": f"chunk-{i}", "request": request}) + "\n")
+        requests_path = f.name
+
+    try:
+        uploaded = client.files.upload(
+            file=requests_path,
+            config=types.UploadFileConfig(display_name="clipper-batch", mime_type="jsonl")
+        )
+    finally:
+        os.unlink(requests_path)
+
+    job = client.batches.create(
+        model=MODEL,
+        src=uploaded.name,
+        config={"display_name": "clipper-viral-analysis"}
+    )
+    if verbose:
+        print(f"  Submitted batch job {job.name} ({total_prompts} requests)")
+
+    while job.state.name not in BATCH_DONE_STATES:
+        time.sleep(BATCH_POLL_SECONDS)
+        job = client.batches.get(name=job.name)
+        if verbose:
+            print(f"  Batch job state: {job.state.name}")
+
+    if job.state.name != "JOB_STATE_SUCCEEDED":
+        error = f"Batch job ended in state {job.state.name}"
+        return [json_dumps({"clips": [], "error": error})] * total_prompts
+
+    raw_results = [json_dumps({"clips": [], "error": "Missing batch response"})] * total_prompts
+    content = client.files.download(file=job.dest.file_name).decode("utf-8")
+
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        item = json_loads(line)
+        index = int(item["key"].split("-")[1]) - 1
+        try:
+            parts = item["response"]["candidates"][0]["content"]["parts"]
+            raw_results[index] = "".join(part.get("text", "") for part in parts)
+            if _is_cacheable(raw_results[index]):
+                save_cached_response(MODEL, prompts[index], raw_results[index])
+        except (KeyError, IndexError):
+            raw_results[index] = json_dumps({"clips": [], "error": str(item.get("error", "Empty response"))})
+
+    return raw_results
+
+
+def parse_analysis_results(parsed_results):
+    """Merge parsed LLM result dicts (see _parse_response) into a unified clip list"""
     all_clips = []
     
-    for chunk_index, result in enumerate(raw_results):
-        try:
-            data = json.loads(result.replace("```json", "").replace("```", ""))
-            clips = data.get("clips", [])
-            
-            for clip in clips:
-                clip["chunk_index"] = chunk_index + 1
-                all_clips.append(clip)
-                
-        except json.JSONDecodeError as e:
-            print(f"Warning: Failed to parse chunk {chunk_index + 1} result: {e}")
-            continue
+    for chunk_index, data in enumerate(parsed_results):
+        for clip in data.get("clips", []):
+            # Packed prompts tag each clip with the chunk it came from
+            source_chunk = clip.pop("source_chunk", None)
+            clip["chunk_index"] = source_chunk if isinstance(source_chunk, int) else chunk_index + 1
+            all_clips.append(clip)
     
     return all_clips
 
 
 def rank_clips(clips):
-    """Rank clips by viral score"""
-    return sorted(
-        clips,
-        key=lambda x: x.get("viral_score", 0),
-        reverse=True
-    )
+    """Rank clips by viral score (ties keep their original order)"""
+    # Decorate once instead of calling a key lambda per element; the index
+    # breaks ties so dicts are never compared
+    keyed = [(-clip.get("viral_score", 0), i, clip) for i, clip in enumerate(clips)]
+    keyed.sort()
+    return [clip for _, _, clip in keyed]
+
+
+@lru_cache(maxsize=4096)
+def timestamp_to_seconds(ts):
+    """Convert an "HH:MM:SS,mmm" or "MM:SS" timestamp to seconds"""
+    match = _TIMESTAMP_RE.fullmatch(ts)
+    if not match:
+        return 0
+    hours, minutes, seconds = match.groups()
+    return int(hours or 0) * 3600 + int(minutes) * 60 + float(seconds.replace(",", "."))
 
 
 def deduplicate_clips(clips, time_threshold_seconds=10):
-    """Remove duplicate clips that overlap in time"""
+    """
+    Remove duplicate clips that overlap in time.
+
+    Clips are sorted by start time once and swept in a single pass: a clip
+    starting within `time_threshold_seconds` of the last kept clip is a
+    duplicate, and the higher viral score wins.
+    """
     if not clips:
         return clips
     
-    def timestamp_to_seconds(ts):
-        parts = ts.split(":")
-        if len(parts) == 3:
-            h, m, s = parts
-            return int(h) * 3600 + int(m) * 60 + float(s.replace(",", "."))
-        elif len(parts) == 2:
-            m, s = parts
-            return int(m) * 60 + float(s.replace(",", "."))
-        return 0
+    # Parse every start timestamp exactly once
+    timed_clips = sorted(
+        ((timestamp_to_seconds(clip.get("timestamp_start", "00:00:00")), clip) for clip in clips),
+        key=lambda item: item[0]
+    )
     
     unique_clips = []
-    
-    for clip in clips:
-        start = timestamp_to_seconds(clip.get("timestamp_start", "00:00:00"))
-        is_duplicate = False
-        
-        for existing in unique_clips:
-            existing_start = timestamp_to_seconds(existing.get("timestamp_start", "00:00:00"))
-            
-            if abs(start - existing_start) < time_threshold_seconds:
-                # Keep the one with higher viral score
-                if clip.get("viral_score", 0) > existing.get("viral_score", 0):
-                    unique_clips.remove(existing)
-                    unique_clips.append(clip)
-                is_duplicate = True
-                break
-        
-        if not is_duplicate:
+    last_start = None
+    
+    for start, clip in timed_clips:
+        if unique_clips and start - last_start < time_threshold_seconds:
+            # Keep the one with higher viral score
+            if clip.get("viral_score", 0) > unique_clips[-1].get("viral_score", 0):
+                unique_clips[-1] = clip
+                last_start = start
+        else:
             unique_clips.append(clip)
+            last_start = start
     
     return unique_clips
 
 
+# Content type emoji mapping
+_TYPE_EMOJI = {
+    "educational": "📚",
+    "entertainment": "🎬",
+    "inspirational": "✨",
+    "controversial": "🔥",
+    "storytelling": "📖"
+}
+
+# Emotion emoji mapping
+_EMOTION_EMOJI = {
+    "curiosity": "🤔",
+    "surprise": "😮",
+    "humor": "😂",
+    "inspiration": "💪",
+    "outrage": "😡"
+}
+
+_CLIP_TEMPLATE = """
+{sep}
+{i}. {s_emoji} VIRAL SCORE: {score}/10
+{sep}
+📍 Timestamp: {start} --> {end}
+🎬 Title: {title}
+🪝 Hook: "{hook}"
+
+{t_emoji} Content Type: {content_type}
+{e_emoji} Target Emotion: {emotion}
+
+💡 Why it works:
+   {reason}
+
+🎯 Engagement Triggers: {triggers}
+📱 Platforms: {platforms}
+#️⃣  Hashtags: {hashtags}
+📦 Found in chunk: {chunk}"""
+
+
+def _score_emoji(score):
+    """Score emoji mapping"""
+    if score >= 8.5:
+        return "🔥"
+    elif score >= 7.0:
+        return "⭐"
+    elif score >= 5.0:
+        return "💡"
+    return "📌"
+
+
 def format_final_results(ranked_clips, output_format="text"):
     """Format ranked clips into readable output or JSON"""
+    buf = io.StringIO()
+    write_final_results(ranked_clips, buf, output_format)
+    return buf.getvalue()
+
+
+def write_final_results(ranked_clips, fp, output_format="text"):
+    """Write ranked clips to a text file handle in the requested format"""
     
     if output_format == "json":
-        return json.dumps({"clips": ranked_clips}, indent=2)
+        fp.write(json_dumps({"clips": ranked_clips}, indent=2))
+        return
     
     if output_format == "csv":
-        return format_as_csv(ranked_clips)
+        format_as_csv(ranked_clips, fp)
+        return
     
     if not ranked_clips:
-        return "No viral-worthy moments found in the transcript."
+        fp.write("No viral-worthy moments found in the transcript.")
+        return
     
-    output_lines = []
+    # Summary statistics, collected in a single pass
+    high_count = medium_count = low_count = 0
+    total_score = 0
+    platform_counts = Counter()
+    content_counts = Counter()
     
-    # Score emoji mapping
-    def get_score_emoji(score):
+    for clip in ranked_clips:
+        score = clip.get("viral_score", 0)
+        total_score += score
         if score >= 8.5:
-            return "🔥"
+            high_count += 1
         elif score >= 7.0:
-            return "⭐"
-        elif score >= 5.0:
-            return "💡"
-        return "📌"
-    
-    # Content type emoji mapping
-    type_emoji = {
-        "educational": "📚",
-        "entertainment": "🎬",
-        "inspirational": "✨",
-        "controversial": "🔥",
-        "storytelling": "📖"
-    }
-    
-    # Emotion emoji mapping
-    emotion_emoji = {
-        "curiosity": "🤔",
-        "surprise": "😮",
-        "humor": "😂",
-        "inspiration": "💪",
-        "outrage": "😡"
-    }
+            medium_count += 1
+        else:
+            low_count += 1
+        platform_counts.update(clip.get("platforms", []))
+        content_counts[clip.get("content_type", "unknown")] += 1
     
-    for i, clip in enumerate(ranked_clips, 1):
-        score = clip.get("viral_score", 0)
-        content_type = clip.get("content_type", "unknown")
-        emotion = clip.get("target_emotion", "unknown")
-        
-        s_emoji = get_score_emoji(score)
-        t_emoji = type_emoji.get(content_type, "📌")
-        e_emoji = emotion_emoji.get(emotion, "💭")
-        
-        output_lines.append(f"\n{'='*60}")
-        output_lines.append(f"{i}. {s_emoji} VIRAL SCORE: {score}/10")
-        output_lines.append(f"{'='*60}")
-        output_lines.append(f"📍 Timestamp: {clip.get('timestamp_start')} --> {clip.get('timestamp_end')}")
-        output_lines.append(f"🎬 Title: {clip.get('suggested_title', 'N/A')}")
-        output_lines.append(f"🪝 Hook: \"{clip.get('hook_text', 'N/A')}\"")
-        output_lines.append(f"")
-        output_lines.append(f"{t_emoji} Content Type: {content_type}")
-        output_lines.append(f"{e_emoji} Target Emotion: {emotion}")
-        output_lines.append(f"")
-        output_lines.append(f"💡 Why it works:")
-        output_lines.append(f"   {clip.get('reason', 'N/A')}")
-        output_lines.append(f"")
-        output_lines.append(f"🎯 Engagement Triggers: {', '.join(clip.get('engagement_triggers', []))}")
-        output_lines.append(f"📱 Platforms: {', '.join(clip.get('platforms', []))}")
-        output_lines.append(f"#️⃣  Hashtags: {' '.join(clip.get('hashtags', []))}")
-        output_lines.append(f"📦 Found in chunk: {clip.get('chunk_index', 'N/A')}")
-    
-    # Summary statistics
-    high_count = sum(1 for c in ranked_clips if c.get("viral_score", 0) >= 8.5)
-    medium_count = sum(1 for c in ranked_clips if 7.0 <= c.get("viral_score", 0) < 8.5)
-    low_count = sum(1 for c in ranked_clips if c.get("viral_score", 0) < 7.0)
-    
-    avg_score = sum(c.get("viral_score", 0) for c in ranked_clips) / len(ranked_clips)
-    
-    # Platform distribution
-    platform_counts = {}
-    for clip in ranked_clips:
-        for platform in clip.get("platforms", []):
-            platform_counts[platform] = platform_counts.get(platform, 0) + 1
+    avg_score = total_score / len(ranked_clips)
     
-    # Content type distribution
-    content_counts = {}
-    for clip in ranked_clips:
-        ct = clip.get("content_type", "unknown")
-        content_counts[ct] = content_counts.get(ct, 0) + 1
-    
-    summary = f"""
+    fp.write(f"""
 {'='*60}
 📊 ANALYSIS SUMMARY
 {'='*60}
@@ -204,66 +456,165 @@ Score Distribution:
   💡 Moderate (5.0-6.9): {low_count}
 
 Platform Recommendations:
-{chr(10).join(f'  📱 {platform}: {count} clips' for platform, count in sorted(platform_counts.items(), key=lambda x: x[1], reverse=True))}
+{chr(10).join(f'  📱 {platform}: {count} clips' for platform, count in platform_counts.most_common())}
 
 Content Types:
-{chr(10).join(f'  {type_emoji.get(ct, "📌")} {ct}: {count} clips' for ct, count in sorted(content_counts.items(), key=lambda x: x[1], reverse=True))}
+{chr(10).join(f'  {_TYPE_EMOJI.get(ct, "📌")} {ct}: {count} clips' for ct, count in content_counts.most_common())}
 
 {'='*60}
 📋 DETAILED RESULTS
 {'='*60}
-"""
+""")
     
-    return summary + "\n".join(output_lines)
+    # Clip details are streamed one clip at a time
+    for i, clip in enumerate(ranked_clips, 1):
+        score = clip.get("viral_score", 0)
+        content_type = clip.get("content_type", "unknown")
+        emotion = clip.get("target_emotion", "unknown")
+        
+        if i > 1:
+            fp.write("\n")
+        fp.write(_CLIP_TEMPLATE.format_map({
+            "sep": "=" * 60,
+            "i": i,
+            "score": score,
+            "s_emoji": _score_emoji(score),
+            "t_emoji": _TYPE_EMOJI.get(content_type, "📌"),
+            "e_emoji": _EMOTION_EMOJI.get(emotion, "💭"),
+            "start": clip.get("timestamp_start"),
+            "end": clip.get("timestamp_end"),
+            "title": clip.get("suggested_title", "N/A"),
+            "hook": clip.get("hook_text", "N/A"),
+            "content_type": content_type,
+            "emotion": emotion,
+            "reason": clip.get("reason", "N/A"),
+            "triggers": ", ".join(clip.get("engagement_triggers", [])),
+            "platforms": ", ".join(clip.get("platforms", [])),
+            "hashtags": " ".join(clip.get("hashtags", [])),
+            "chunk": clip.get("chunk_index", "N/A"),
+        }))
+
+
+def consolidate_clips(parsed_results):
+    """Deduplicate and rank clips from all parsed chunk results"""
+    clips = parse_analysis_results(parsed_results)
+    deduplicated_clips = deduplicate_clips(clips)
+    return rank_clips(deduplicated_clips)
 
 
 def consolidate_results(raw_results, output_format="text"):
     """Consolidate and rank results from all chunks"""
-    clips = parse_analysis_results(raw_results)
-    deduplicated_clips = deduplicate_clips(clips)
-    ranked_clips = rank_clips(deduplicated_clips)
-    return format_final_results(ranked_clips, output_format)
+    parsed_results = [_parse_response(result) for result in raw_results]
+    return format_final_results(consolidate_clips(parsed_results), output_format)
+
 
+def _report_chunk_result(i, data):
+    """Print a one-line progress summary for a request's parsed result"""
+    clip_count = len(data.get("clips", []))
+    if data.get("error"):
+        print(f"    Request {i}: warning, {data['error']}")
+    elif clip_count == 0:
+        print(f"    Request {i}: no viral moments")
+    else:
+        print(f"    Request {i}: found {clip_count} potential clip(s)")
 
-def analyze_for_viral_content(chunks, verbose=True, output_format="text"):
+
+def find_viral_clips(chunks, verbose=True, batch=False, chunks_per_prompt=1, use_cache=True):
     """
-    Main function to analyze all chunks for viral content.
+    Analyze all chunks for viral content and return the ranked clips.
     
     Args:
         chunks: List of subtitle chunks
-        verbose: Print progress updates
-        output_format: "text" for formatted output, "json" for raw JSON
+        verbose: Print progress updates (2 or more also prints raw responses)
+        batch: Submit all chunks as one Gemini batch job instead of live requests
+        chunks_per_prompt: Number of chunks packed into each prompt
+        use_cache: Reuse cached LLM responses for identical prompts
     
     Returns:
-        Formatted string with ranked viral moments
+        List of deduplicated clip dicts, highest viral score first
     """
     client = get_client()
-    total_chunks = len(chunks)
-    raw_results = []
-    
-    for i, chunk in enumerate(chunks, 1):
+    prompts = build_prompts(chunks, chunks_per_prompt)
+    total_prompts = len(prompts)
+    results = [None] * total_prompts
+    
+    # Serve identical prompts from the on-disk cache; only misses hit the API
+    pending = []
+    for i, prompt in enumerate(prompts):
+        cached = get_cached_response(MODEL, prompt) if use_cache else None
+        if cached is None:
+            pending.append(i)
+        else:
+            results[i] = _parse_response(cached)
+    
+    if verbose and len(pending) < total_prompts:
+        print(f"  Reusing {total_prompts - len(pending)} cached response(s)")
+    
+    if batch and pending:
+        batch_results = analyze_batch(client, [prompts[i] for i in pending], verbose)
+        for i, result in zip(pending, batch_results):
+            results[i] = _parse_response(result)
+            if verbose >= 2:
+                print(result)
+            if verbose:
+                _report_chunk_result(i + 1, results[i])
+    elif pending:
+        max_workers = max(1, int(os.getenv("LLM_CONCURRENCY", "8")))
+        
         if verbose:
-            print(f"  Analyzing chunk {i}/{total_chunks}...")
+            print(f"  Analyzing {len(chunks)} chunks in {len(pending)} requests "
+                  f"({max_workers} concurrent)...")
         
-        result = analyze_chunk(client, chunk, i, total_chunks)
-        print(result)
-        raw_results.append(result)
+        # Only single-chunk prompts share the cacheable prefix
+        cache_name = None
+        if PROMPT_CACHE_ENABLED and chunks_per_prompt <= 1 and len(pending) > 1:
+            cache_name = create_prompt_cache(client)
         
-        if verbose:
-            try:
-                data = json.loads(result.replace("```json", "").replace("```", ""))
-                clip_count = len(data.get("clips", []))
-                if clip_count == 0:
-                    print(f"    No viral moments in this chunk")
-                else:
-                    print(f"    Found {clip_count} potential clip(s)")
-            except json.JSONDecodeError:
-                print(f"    Warning: Invalid JSON response")
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(analyze_prompt, client, prompts[i], False, cache_name): i
+                    for i in pending
+                }
+                
+                for future in as_completed(futures):
+                    i = futures[future]
+                    result = future.result()
+                    results[i] = _parse_response(result)
+                    
+                    if verbose >= 2:
+                        print(result)
+                    
+                    if verbose:
+                        _report_chunk_result(i + 1, results[i])
+        finally:
+            if cache_name:
+                delete_prompt_cache(client, cache_name)
         
     if verbose:
         print("  Consolidating and ranking results...")
     
-    return consolidate_results(raw_results, output_format)
+    return consolidate_clips(results)
+
+
+def analyze_for_viral_content(chunks, verbose=True, output_format="text", batch=False,
+                              chunks_per_prompt=1, use_cache=True):
+    """
+    Main function to analyze all chunks for viral content.
+    
+    Args:
+        chunks: List of subtitle chunks
+        verbose: Print progress updates
+        output_format: "text" for formatted output, "json" for raw JSON
+        batch: Submit all chunks as one Gemini batch job instead of live requests
+        chunks_per_prompt: Number of chunks packed into each prompt
+        use_cache: Reuse cached LLM responses for identical prompts
+    
+    Returns:
+        Formatted string with ranked viral moments
+    """
+    ranked_clips = find_viral_clips(chunks, verbose, batch, chunks_per_prompt, use_cache)
+    return format_final_results(ranked_clips, output_format)
 
 
 def get_clips_as_json(chunks, verbose=True):
@@ -278,12 +629,23 @@ def get_clips_as_json(chunks, verbose=True):
         Dictionary with clips list
     """
     result = analyze_for_viral_content(chunks, verbose, output_format="json")
-    return json.loads(result.replace("```json", "").replace("```", ""))
+    return json_loads(_strip_code_fences(result))
 
-def format_as_csv(clips):
-    """Format clips as CSV string"""
+def format_as_csv(clips, fp=None):
+    """
+    Format clips as CSV.
+
+    Rows are written straight to `fp` when given; otherwise the CSV is
+    returned as a string.
+    """
+    if fp is None:
+        buf = io.StringIO()
+        format_as_csv(clips, buf)
+        return buf.getvalue()
+    
     if not clips:
-        return "No viral-worthy moments found in the transcript."
+        fp.write("No viral-worthy moments found in the transcript.")
+        return
     
     # Define CSV columns
     fieldnames = [
@@ -302,9 +664,7 @@ def format_as_csv(clips):
         "chunk_index"
     ]
     
-    # Write to string buffer
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=fieldnames, extrasaction='ignore', lineterminator='\n')
+    writer = csv.DictWriter(fp, fieldnames=fieldnames, extrasaction='ignore', lineterminator='\n')
     
     writer.writeheader()
     
@@ -324,6 +684,4 @@ def format_as_csv(clips):
             "hashtags": " ".join(clip.get("hashtags", [])),
             "chunk_index": clip.get("chunk_index", "")
         }
-        writer.writerow(row)
-    
-    return output.getvalue()
\ No newline at end of file
+        writer.writerow(row)
\ No newline at end of file
@@ -0,0 +1,28 @@
+import hashlib
+import os
+from config import TEMP_DIR
+
+CACHE_DIR = TEMP_DIR / "llm_cache"
+
+
+def cache_key(model, prompt):
+    """Stable cache key for a (model, prompt) pair"""
+    return hashlib.sha256((model + prompt).encode("utf-8")).hexdigest()
+
+
+def get_cached_response(model, prompt):
+    """Return the cached raw LLM response for this prompt, or None on a miss"""
+    path = CACHE_DIR / f"{cache_key(model, prompt)}.json"
+    try:
+        return path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+
+
+def save_cached_response(model, prompt, response):
+    """Store a raw LLM response on disk (atomic, safe across worker threads)"""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = CACHE_DIR / f"{cache_key(model, prompt)}.json"
+    tmp_path = path.with_suffix(f".{os.getpid()}.{id(response)}.tmp")
+    tmp_path.write_text(response, encoding="utf-8")
+    os.replace(tmp_path, path)
@@ -1,6 +1,3 @@
 def format_chunk_for_prompt(chunk):
     """Format a chunk for LLM prompt"""
-    lines = []
-    for sub in chunk:
-        lines.append(f"[{sub['timestamp']}] {sub['text']}")
-    return '\n'.join(lines)
\ No newline at end of file
+    return '\n'.join([f"[{sub['timestamp']}] {sub['text']}" for sub in chunk])
\ No newline at end of file
@@ -44,4 +44,61 @@ Below 5: Weak, skip unless nothing else available
 Sort clips by viral_score (highest first).
 
 TRANSCRIPT:
-<transcript>"""
\ No newline at end of file
+<transcript>"""
+
+MULTI_TRANSCRIPT_PROMPT = """You are a viral content analyst specializing in identifying high-engagement moments from video transcripts.
+
+You will receive <count> transcript excerpts, each wrapped in <transcript id='k'>...</transcript> tags.
+Analyze every excerpt independently and identify potential viral clips/segments in each.
+
+**Look for these engagement triggers:**
+- Hooks (surprising statements, bold claims, curiosity gaps)
+- Emotional peaks (humor, shock, inspiration, controversy)
+- Quotable soundbites
+- Story climaxes or reveals
+- Contrarian/unexpected opinions
+- Relatable universal experiences
+- "I never knew that" educational moments
+
+---
+
+**Return your analysis as a single JSON object following this exact structure:**
+
+```json
+{
+  "clips": [
+    {
+      "id": 1,
+      "source_chunk": 1,
+      "timestamp_start": "00:00:00",
+      "timestamp_end": "00:00:00",
+      "suggested_title": "Catchy title for the clip",
+      "hook_text": "Opening line or text overlay suggestion",
+      "reason": "Explanation of why this has viral potential",
+      "engagement_triggers": ["hook", "emotional", "quotable"],
+      "viral_score": 8.5,
+      "platforms": ["tiktok", "reels", "shorts"],
+      "hashtags": ["#hashtag1", "#hashtag2"],
+      "content_type": "educational | entertainment | inspirational | controversial | storytelling",
+      "target_emotion": "curiosity | surprise | humor | inspiration | outrage"
+    }
+  ]
+}
+
+"source_chunk" MUST be the id of the <transcript> tag the clip was found in.
+A clip must never span two transcript excerpts.
+
+Scoring Guidelines (viral_score 1-10):
+
+9-10: Extremely high viral potential, multiple strong triggers
+7-8: Strong potential, clear hook and emotional resonance
+5-6: Moderate potential, good but may need editing
+Below 5: Weak, skip unless nothing else available
+Sort clips by viral_score (highest first).
+
+TRANSCRIPTS:
+<transcripts>"""
+
+
+# Static instructions preceding the transcript; cached server-side once per run
+VIRALITY_DETECTION_PREFIX = VIRALITY_DETECTION_PROMPT.partition("TRANSCRIPT:")[0]
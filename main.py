@@ -1,14 +1,15 @@
 import sys
-import json
+import bisect
+import os
 import re
+import shutil
+import queue
+import threading
 from pathlib import Path
 import logging
-from config import TEMP_DIR, OUTPUT_DIR
-from utils.video_downloader import VideoDownloader
-from utils.transcript_fetcher import TranscriptFetcher
-from utils.segment_analyzer import SegmentAnalyzer
-from utils.video_processor import VideoProcessor
-from utils.caption_generator import CaptionGenerator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.json_utils import json_loads
+from config import TEMP_DIR, OUTPUT_DIR, CLIP_WORKERS, CLIP_PIPELINE, FFMPEG_THREADS, ensure_dirs
 
 logging.basicConfig(
     level=logging.INFO,
@@ -19,6 +20,13 @@ logger = logging.getLogger(__name__)
 BASE_DIR = Path(__file__).parent
 SEGMENTS_FILE = BASE_DIR / "segments.json"
 
+_UNSAFE_TITLE_RE = re.compile(r'[^\w\s-]')
+
+
+def _safe_title(clip: dict) -> str:
+    """Filesystem-safe clip title used in output file names"""
+    return _UNSAFE_TITLE_RE.sub('', clip.get('title', '')).strip().replace(' ', '_')[:50]
+
 
 def parse_srt_timestamp(ts: str) -> float:
     """Parse SRT-style timestamp to seconds. Supports HH:MM:SS,mmm / HH:MM:SS / MM:SS"""
@@ -38,8 +46,7 @@ def parse_srt_timestamp(ts: str) -> float:
 
 def load_segments(segments_path: Path) -> list:
     """Load clips from segments.json and convert timestamps to seconds"""
-    with open(segments_path, 'r') as f:
-        data = json.load(f)
+    data = json_loads(Path(segments_path).read_bytes())
 
     clips = []
     for seg in data['clips']:
@@ -61,6 +68,14 @@ class ClipperPipeline:
     """Complete pipeline for creating clips from YouTube videos"""
 
     def __init__(self):
+        # Heavy dependencies (yt-dlp, OpenCV, MediaPipe, OpenAI) are imported here
+        # rather than at module load so `main.py --help` starts instantly
+        from utils.video_downloader import VideoDownloader
+        from utils.transcript_fetcher import TranscriptFetcher
+        from utils.segment_analyzer import SegmentAnalyzer
+        from utils.video_processor import VideoProcessor
+
+        ensure_dirs()
         self.downloader = VideoDownloader(TEMP_DIR)
         self.transcript_fetcher = TranscriptFetcher()
         self.segment_analyzer = SegmentAnalyzer()
@@ -73,6 +88,7 @@ class ClipperPipeline:
         aspect_ratio: str = 'vertical',
         caption_preset: str = 'bold',
         segments_file: Path = None,
+        use_cache: bool = True,
     ) -> list:
         """
         Full pipeline:
@@ -87,6 +103,7 @@ class ClipperPipeline:
             aspect_ratio: 'vertical', 'square', or 'horizontal'
             caption_preset: Caption style ('minimal', 'bold', etc.)
             segments_file: Optional pre-existing segments.json (skips LLM step)
+            use_cache: Reuse a cached LLM response for the same transcript
 
         Returns:
             List of result dicts per clip
@@ -95,10 +112,9 @@ class ClipperPipeline:
 
         # Clean output directory
         if output_dir.exists():
-            for f in output_dir.iterdir():
-                if f.is_file():
-                    f.unlink()
+            shutil.rmtree(output_dir, ignore_errors=True)
             logger.info(f"Cleared output directory: {output_dir}")
+        output_dir.mkdir(parents=True, exist_ok=True)
 
         # --- Step 1: Fetch transcript ---
         logger.info("Step 1: Fetching transcript...")
@@ -138,7 +154,7 @@ class ClipperPipeline:
 
             logger.info("Step 2: Analyzing transcript with LLM for viral segments...")
             try:
-                self.segment_analyzer.analyze_and_save(srt_content, segments_file)
+                self.segment_analyzer.analyze_and_save(srt_content, segments_file, use_cache=use_cache)
             except Exception as e:
                 logger.error(f"LLM analysis failed: {e}")
                 return []
@@ -150,8 +166,6 @@ class ClipperPipeline:
         logger.info("Step 3: Extracting stream URLs...")
         try:
             stream_info = self.downloader.get_stream_url(youtube_url)
-            video_url = stream_info['video_url']
-            audio_url = stream_info['audio_url']
             logger.info(f"Got stream URLs for: {stream_info['title']}")
         except Exception as e:
             logger.error(f"Failed to get stream URLs: {e}")
@@ -161,67 +175,281 @@ class ClipperPipeline:
         logger.info(f"Step 4: Cropping & captioning {len(clips)} clips...")
         results = []
 
+        # Build every clip's captions up front so the render workers only
+        # consume prebuilt subtitle paths
+        subtitle_files = {}
+        if caption_preset and transcript_data:
+            subtitle_files = self._generate_clip_captions(clips, transcript_data, caption_preset, output_dir)
+
+        if CLIP_PIPELINE == 'stages':
+            logger.info("Rendering as a fetch -> crop detection -> encode pipeline")
+            results = self._run_clip_stages(
+                clips, output_dir, stream_info, subtitle_files, aspect_ratio, FFMPEG_THREADS
+            )
+        else:
+            workers = max(1, min(len(clips), CLIP_WORKERS))
+            ffmpeg_threads = FFMPEG_THREADS or max(1, (os.cpu_count() or 1) // workers)
+            logger.info(f"Rendering with {workers} worker(s), {ffmpeg_threads} FFmpeg thread(s) each")
+
+            # Each clip is an independent ffprobe/FFmpeg job, so threads are enough
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(
+                        self._process_clip, i, clip, len(clips), output_dir,
+                        stream_info, subtitle_files.get(i), aspect_ratio, ffmpeg_threads
+                    )
+                    for i, clip in enumerate(clips, 1)
+                ]
+                for future in as_completed(futures):
+                    results.append(future.result())
+
+        results.sort(key=lambda r: r['clip_number'])
+
+        success_count = sum(1 for r in results if r.get('success'))
+        logger.info(f"Pipeline complete! Created {success_count}/{len(clips)} clips")
+        return results
+
+    def _generate_clip_captions(self, clips: list, transcript_data: list,
+                                caption_preset: str, output_dir: Path) -> dict:
+        """
+        Write the .ass captions and per-clip SRT for every clip in one pass
+
+        Returns:
+            Dict of clip number -> .ass path (clips without speech are omitted)
+        """
+        from utils.caption_generator import CaptionGenerator
+
+        # Sorted segment starts let each clip slice its captions by bisection
+        # instead of scanning the whole transcript
+        transcript_data = sorted(transcript_data, key=lambda seg: seg['start'])
+        segment_starts = [seg['start'] for seg in transcript_data]
+        caption_gen = CaptionGenerator(preset=caption_preset)
+
+        subtitle_files = {}
         for i, clip in enumerate(clips, 1):
             start_sec = clip['start_time']
-            end_sec = clip['end_time']
-            clip_duration = end_sec - start_sec
-            safe_title = re.sub(r'[^\w\s-]', '', clip.get('title', '')).strip().replace(' ', '_')[:50]
-            clip_name = f"clip_{i}_{safe_title}.mp4"
-            output_path = output_dir / clip_name
-
-            logger.info(f"[{i}/{len(clips)}] {clip.get('title', '')} "
-                         f"({start_sec:.1f}s - {end_sec:.1f}s, score={clip['viral_score']})")
-
-            # Generate subtitles
-            subtitle_file = None
-            if caption_preset and transcript_data:
-                clip_transcript = [
-                    {
-                        'text': seg['text'],
-                        'start': seg['start'] - start_sec,
-                        'duration': seg['duration']
-                    }
-                    for seg in transcript_data
-                    if start_sec <= seg['start'] <= end_sec
-                ]
+            lo = bisect.bisect_left(segment_starts, start_sec)
+            hi = bisect.bisect_right(segment_starts, clip['end_time'])
+            clip_transcript = [
+                {
+                    'text': seg['text'],
+                    'start': seg['start'] - start_sec,
+                    'duration': seg['duration']
+                }
+                for seg in transcript_data[lo:hi]
+            ]
+
+            if clip_transcript:
+                subtitle_files[i] = TEMP_DIR / f"clip_{i}.ass"
+                caption_gen.generate_ass_file(clip_transcript, subtitle_files[i])
+
+                # Save per-clip SRT
+                srt_name = f"clip_{i}_{_safe_title(clip)}.srt"
+                self.transcript_fetcher.save_srt(clip_transcript, str(output_dir / srt_name))
+
+        return subtitle_files
+
+    def _process_clip(
+        self,
+        i: int,
+        clip: dict,
+        total: int,
+        output_dir: Path,
+        stream_info: dict,
+        subtitle_file: Path,
+        aspect_ratio: str,
+        ffmpeg_threads: int,
+    ) -> dict:
+        """Crop and render a single clip (captions prebuilt); returns its result dict"""
+        job = self._prepare_clip_input(i, clip, total, output_dir, stream_info, subtitle_file)
+        return self._render_clip(job, aspect_ratio, ffmpeg_threads)
+
+    def _run_clip_stages(
+        self,
+        clips: list,
+        output_dir: Path,
+        stream_info: dict,
+        subtitle_files: dict,
+        aspect_ratio: str,
+        ffmpeg_threads: int,
+    ) -> list:
+        """
+        Render clips as a fetch -> crop detection -> encode pipeline
 
-                if clip_transcript:
-                    caption_gen = CaptionGenerator(preset=caption_preset)
-                    subtitle_file = TEMP_DIR / f"clip_{i}.ass"
-                    caption_gen.generate_ass_file(clip_transcript, subtitle_file)
+        Each stage runs on its own thread (encode on the calling one), so the
+        next clip is fetched and analyzed while the current one encodes. If a
+        stage fails, the others stop and its exception is raised here.
+        """
+        crop_queue = queue.Queue(maxsize=2)
+        encode_queue = queue.Queue(maxsize=2)
+        # Set when any stage fails, so the others stop instead of blocking on
+        # a queue nobody drains; the first error is re-raised below
+        stop = threading.Event()
+        errors = []
+
+        def put(q, item):
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def get(q):
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            return None
+
+        def fetch_stage():
+            try:
+                for i, clip in enumerate(clips, 1):
+                    if not put(crop_queue, self._prepare_clip_input(
+                        i, clip, len(clips), output_dir, stream_info, subtitle_files.get(i)
+                    )):
+                        return
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                put(crop_queue, None)
+
+        def crop_stage():
+            try:
+                while (job := get(crop_queue)) is not None:
+                    # Stream-copied clips never use a crop position
+                    if not (job['video_info'] and self.video_processor.can_stream_copy(
+                            job['video_info'], aspect_ratio, job['subtitle_file'])):
+                        job['crop'] = self._detect_clip_crop(job)
+                    if not put(encode_queue, job):
+                        return
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                put(encode_queue, None)
+
+        stages = [threading.Thread(target=fetch_stage, daemon=True),
+                  threading.Thread(target=crop_stage, daemon=True)]
+        for stage in stages:
+            stage.start()
 
-                    # Save per-clip SRT
-                    srt_name = f"clip_{i}_{safe_title}.srt"
-                    self.transcript_fetcher.save_srt(clip_transcript, str(output_dir / srt_name))
+        results = []
+        try:
+            while (job := get(encode_queue)) is not None:
+                results.append(self._render_clip(job, aspect_ratio, ffmpeg_threads))
+        finally:
+            stop.set()
+            for stage in stages:
+                stage.join()
+
+        if errors:
+            raise errors[0]
+        return results
 
-            # Stream segment directly from YouTube, crop & process
+    def _prepare_clip_input(
+        self,
+        i: int,
+        clip: dict,
+        total: int,
+        output_dir: Path,
+        stream_info: dict,
+        subtitle_file: Path,
+    ) -> dict:
+        """Resolve a clip's input (fetching HLS segments if applicable) into a render job"""
+        start_sec = clip['start_time']
+        end_sec = clip['end_time']
+        clip_duration = end_sec - start_sec
+
+        logger.info(f"[{i}/{total}] {clip.get('title', '')} "
+                     f"({start_sec:.1f}s - {end_sec:.1f}s, score={clip['viral_score']})")
+
+        # Stream segment directly from YouTube by default
+        job = {
+            'clip_number': i,
+            'clip': clip,
+            'output_path': output_dir / f"clip_{i}_{_safe_title(clip)}.mp4",
+            'subtitle_file': subtitle_file,
+            'input_path': stream_info['video_url'],
+            'audio_url': stream_info['audio_url'],
+            'start_time': start_sec,
+            'end_time': end_sec,
+            'hls_dir': None,
+            'crop': None,
+            # Resolution of the selected format, so create_clip needn't probe the stream
+            'video_info': ({'width': stream_info['width'], 'height': stream_info['height']}
+                           if stream_info.get('width') and stream_info.get('height') else None),
+        }
+
+        # Muxed HLS: fetch only the segments covering this clip and work from
+        # a local playlist instead of seeking the remote stream
+        if stream_info.get('is_hls') and job['audio_url'] == job['input_path']:
+            job['hls_dir'] = TEMP_DIR / f"hls_clip_{i}"
             try:
-                result = self.video_processor.create_clip(
-                    input_path=video_url,
-                    output_path=str(output_path),
-                    start_time=start_sec,
-                    end_time=end_sec,
-                    aspect_ratio=aspect_ratio,
-                    crop_method='auto',
-                    subtitle_file=str(subtitle_file) if subtitle_file else None,
-                    audio_url=audio_url
+                window = self.downloader.download_hls_window(
+                    job['input_path'], start_sec, end_sec, job['hls_dir']
                 )
+                if window:
+                    job['input_path'], job['audio_url'] = window['path'], None
+                    job['start_time'] = window['offset']
+                    job['end_time'] = window['offset'] + clip_duration
+            except Exception as e:
+                logger.warning(f"HLS segment download failed for clip {i}, streaming instead: {e}")
 
-                results.append({
-                    **result,
-                    'clip_number': i,
-                    'title': clip.get('title', ''),
-                    'viral_score': clip['viral_score'],
-                    'has_captions': subtitle_file is not None
-                })
+        return job
 
-            except Exception as e:
-                logger.error(f"Failed to process clip {i}: {e}")
-                results.append({'success': False, 'clip_number': i, 'error': str(e)})
+    def _detect_clip_crop(self, job: dict):
+        """Run crop detection for a render job; None leaves it to create_clip"""
+        try:
+            return self.video_processor.crop_detector.detect_crop_position(
+                job['input_path'],
+                job['start_time'],
+                job['end_time'] - job['start_time'],
+                method='auto'
+            )
+        except Exception as e:
+            logger.warning(f"Crop detection failed for clip {job['clip_number']}: {e}")
+            return None
 
-        success_count = sum(1 for r in results if r.get('success'))
-        logger.info(f"Pipeline complete! Created {success_count}/{len(clips)} clips")
-        return results
+    def _render_clip(self, job: dict, aspect_ratio: str, ffmpeg_threads: int) -> dict:
+        """Crop and encode a prepared render job; returns its result dict"""
+        i = job['clip_number']
+        clip = job['clip']
+        subtitle_file = job['subtitle_file']
+
+        try:
+            result = self.video_processor.create_clip(
+                input_path=job['input_path'],
+                output_path=str(job['output_path']),
+                start_time=job['start_time'],
+                end_time=job['end_time'],
+                aspect_ratio=aspect_ratio,
+                crop_method='auto',
+                subtitle_file=str(subtitle_file) if subtitle_file else None,
+                audio_url=job['audio_url'],
+                threads=ffmpeg_threads,
+                crop=job['crop'],
+                video_info=job['video_info']
+            )
+
+            return {
+                **result,
+                'clip_number': i,
+                'title': clip.get('title', ''),
+                'viral_score': clip['viral_score'],
+                'has_captions': subtitle_file is not None
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to process clip {i}: {e}")
+            return {'success': False, 'clip_number': i, 'error': str(e)}
+
+        finally:
+            if job['hls_dir']:
+                shutil.rmtree(job['hls_dir'], ignore_errors=True)
 
 
 def main():
@@ -236,6 +464,8 @@ def main():
                         help='Output aspect ratio (default: vertical)')
     parser.add_argument('--captions', default='bold', choices=['bold', 'minimal', 'colorful', 'subtle', 'none'],
                         help='Caption preset (default: bold)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore cached LLM responses and re-run the analysis')
     args = parser.parse_args()
 
     caption_preset = None if args.captions == 'none' else args.captions
@@ -247,6 +477,7 @@ def main():
         aspect_ratio=args.aspect,
         caption_preset=caption_preset,
         segments_file=segments_file,
+        use_cache=not args.no_cache,
     )
 
     # Print results
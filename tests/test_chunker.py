@@ -0,0 +1,17 @@
+from transcript_parser.chunker import chunk_subtitles
+
+
+def _subtitle(index, start, end):
+    def ts(seconds):
+        return f"00:{seconds // 60:02d}:{seconds % 60:02d},000"
+    return {'index': index, 'timestamp': f"{ts(start)} --> {ts(end)}", 'text': f"line {index}"}
+
+
+def test_duration_chunks_progress_past_gap_longer_than_max_duration():
+    # The overlap walk-back from 90s lands on the 40s chunk's own start;
+    # chunking must move on instead of looping forever
+    subtitles = [_subtitle(1, 0, 2), _subtitle(2, 40, 42), _subtitle(3, 90, 92)]
+
+    chunks = chunk_subtitles(subtitles, max_duration_seconds=30, overlap_seconds=5)
+
+    assert [[sub['index'] for sub in chunk] for chunk in chunks] == [[1], [2], [3]]
@@ -0,0 +1,67 @@
+"""Duration-chunk boundary search, JIT-compiled with Numba when it is installed"""
+
+# Below this many subtitles the JIT compile costs more than the loop it replaces
+NUMBA_MIN_SUBTITLES = 200000
+
+
+def duration_boundaries(starts, max_duration_seconds, overlap_seconds):
+    """
+    Compute (first, end) subtitle index pairs for duration-based chunks
+
+    Args:
+        starts: Subtitle start times in seconds (list, or float64 array for the JIT)
+        max_duration_seconds: Max duration per chunk in seconds
+        overlap_seconds: Overlap duration between chunks in seconds
+
+    Returns:
+        List of (i, j) tuples; chunk k holds subtitles[i:j]
+    """
+    n = len(starts)
+    bounds = []
+    i = 0
+
+    while i < n:
+        chunk_start_time = starts[i]
+        j = i
+        while j < n and starts[j] - chunk_start_time < max_duration_seconds:
+            j += 1
+
+        if j > i:
+            bounds.append((i, j))
+
+        # Find next starting position considering overlap
+        if j >= n:
+            break
+
+        # Move back to the first subtitle of the overlap window
+        overlap_start_time = starts[j] - overlap_seconds
+        k = j
+        while k > 0 and starts[k] > overlap_start_time:
+            k -= 1
+
+        # Ensure we make progress: the walk-back can land on (or before) this
+        # chunk's start when the gap to the next subtitle exceeds the overlap
+        i = k if k > i else j
+
+    return bounds
+
+
+_jit_kernel = None
+
+
+def duration_boundaries_jit():
+    """
+    duration_boundaries compiled with Numba, or None when numba isn't installed
+
+    numba is imported and the kernel built on first call, so importing the
+    chunker (and every clip_finder run) doesn't pay for loading numba.
+    """
+    global _jit_kernel
+    if _jit_kernel is None:
+        try:
+            from numba import njit
+        except ImportError:
+            _jit_kernel = False
+        else:
+            _jit_kernel = njit(cache=True)(duration_boundaries)
+    return _jit_kernel or None
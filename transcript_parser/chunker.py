@@ -1,4 +1,5 @@
 from .timestamp import parse_timestamp, get_end_timestamp
+from ._chunker_numba import duration_boundaries, duration_boundaries_jit, NUMBA_MIN_SUBTITLES
 
 def chunk_subtitles(subtitles, max_duration_seconds=None, max_segments=None, overlap_seconds=5):
     """
@@ -17,59 +18,37 @@ def chunk_subtitles(subtitles, max_duration_seconds=None, max_segments=None, ove
     if not subtitles:
         return []
     
+    # Parse every timestamp once; the chunkers revisit overlapping subtitles
+    starts = [parse_timestamp(sub['timestamp']) for sub in subtitles]
+    ends = [get_end_timestamp(sub['timestamp']) for sub in subtitles]
+    
     # Prefer seconds-based chunking
     if max_duration_seconds is not None:
-        return _chunk_by_duration(subtitles, max_duration_seconds, overlap_seconds)
+        return _chunk_by_duration(subtitles, starts, ends, max_duration_seconds, overlap_seconds)
     elif max_segments is not None:
-        return _chunk_by_segments(subtitles, max_segments, overlap_seconds)
+        return _chunk_by_segments(subtitles, starts, ends, max_segments, overlap_seconds)
     else:
         raise ValueError("Must provide either max_duration_seconds or max_segments")
 
-def _chunk_by_duration(subtitles, max_duration_seconds, overlap_seconds):
+def _chunk_by_duration(subtitles, starts, ends, max_duration_seconds, overlap_seconds):
     """Chunk based on time duration with overlap"""
-    chunks = []
-    i = 0
-    
-    while i < len(subtitles):
-        chunk_start_time = parse_timestamp(subtitles[i]['timestamp'])
-        chunk = []
-        
-        j = i
-        while j < len(subtitles):
-            current_time = parse_timestamp(subtitles[j]['timestamp'])
-            
-            if current_time - chunk_start_time >= max_duration_seconds:
-                break
-            
-            chunk.append({
-                **subtitles[j],
-                'start_seconds': parse_timestamp(subtitles[j]['timestamp']),
-                'end_seconds': get_end_timestamp(subtitles[j]['timestamp'])
-            })
-            j += 1
-        
-        if chunk:
-            chunks.append(chunk)
-        
-        # Find next starting position considering overlap
-        if j >= len(subtitles):
-            break
-            
-        # Move back to include overlap
-        overlap_start_time = parse_timestamp(subtitles[j]['timestamp']) - overlap_seconds
-        i = j
-        
-        # Find the first subtitle that starts at or after overlap_start_time
-        while i > 0 and parse_timestamp(subtitles[i]['timestamp']) > overlap_start_time:
-            i -= 1
-        
-        # Ensure we make progress
-        if i <= chunks[-1][0].get('original_index', 0) if chunks else False:
-            i = j
+    kernel = duration_boundaries_jit() if len(starts) >= NUMBA_MIN_SUBTITLES else None
+    if kernel is not None:
+        import numpy as np
+        bounds = kernel(np.asarray(starts, dtype=np.float64),
+                        float(max_duration_seconds), float(overlap_seconds))
+    else:
+        bounds = duration_boundaries(starts, max_duration_seconds, overlap_seconds)
     
-    return chunks
+    return [
+        [
+            {**subtitles[k], 'start_seconds': starts[k], 'end_seconds': ends[k]}
+            for k in range(i, j)
+        ]
+        for i, j in bounds
+    ]
 
-def _chunk_by_segments(subtitles, max_segments, overlap_seconds):
+def _chunk_by_segments(subtitles, starts, ends, max_segments, overlap_seconds):
     """Chunk based on segment count with time-based overlap"""
     chunks = []
     i = 0
@@ -81,8 +60,8 @@ def _chunk_by_segments(subtitles, max_segments, overlap_seconds):
         for j in range(i, chunk_end):
             chunk.append({
                 **subtitles[j],
-                'start_seconds': parse_timestamp(subtitles[j]['timestamp']),
-                'end_seconds': get_end_timestamp(subtitles[j]['timestamp'])
+                'start_seconds': starts[j],
+                'end_seconds': ends[j]
             })
         
         chunks.append(chunk)
@@ -91,12 +70,12 @@ def _chunk_by_segments(subtitles, max_segments, overlap_seconds):
             break
         
         # Calculate overlap based on seconds
-        overlap_start_time = get_end_timestamp(subtitles[chunk_end - 1]['timestamp']) - overlap_seconds
+        overlap_start_time = ends[chunk_end - 1] - overlap_seconds
         
         # Find new starting position
         new_i = chunk_end
         for k in range(chunk_end - 1, i - 1, -1):
-            if parse_timestamp(subtitles[k]['timestamp']) >= overlap_start_time:
+            if starts[k] >= overlap_start_time:
                 new_i = k
             else:
                 break
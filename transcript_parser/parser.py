@@ -1,23 +1,35 @@
-import re
-
 def parse_srt(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Split by double newline (separates subtitle blocks)
-    blocks = re.split(r'\n\n+', content.strip())
-    
+    """Parse an SRT file line by line into subtitle dicts"""
     subtitles = []
-    for block in blocks:
-        lines = block.strip().split('\n')
-        if len(lines) >= 3:
-            index = lines[0]
-            timestamp = lines[1]
-            text = ' '.join(lines[2:])
+    block = []
+    
+    def flush():
+        # Skip whitespace-only lines at either end of the block
+        first, last = 0, len(block) - 1
+        while first <= last and block[first].isspace():
+            first += 1
+        while last >= first and block[last].isspace():
+            last -= 1
+        if last - first >= 2:
+            text_lines = block[first + 2:last + 1]
+            text_lines[-1] = text_lines[-1].rstrip()
             subtitles.append({
-                'index': index,
-                'timestamp': timestamp,
-                'text': text
+                'index': block[first].lstrip(),
+                'timestamp': block[first + 1],
+                'text': ' '.join(text_lines)
             })
     
+    # Blank lines separate subtitle blocks
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if line:
+                block.append(line)
+            elif block:
+                flush()
+                block = []
+    
+    if block:
+        flush()
+    
     return subtitles
\ No newline at end of file
@@ -1,10 +1,58 @@
 from pathlib import Path
 import logging
+import re
+from functools import lru_cache
+import numpy as np
 from config import CAPTION_PRESETS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_BRACKET_RE = re.compile(r'\[.*?\]')
+_CAPITALIZE_RE = re.compile(r'(^|[.!?]\s+)([a-z])|\bi\b')
+_NEWLINE_TO_SPACE = str.maketrans('\n', ' ')
+
+
+def _capitalize_match(m) -> str:
+    """Upper-case a sentence-initial letter or a standalone "i" matched by _CAPITALIZE_RE"""
+    if m.group(2) is None:
+        return 'I'
+    return m.group(1) + m.group(2).upper()
+
+
+@lru_cache(maxsize=None)
+def _render_ass_header(preset_items: tuple) -> str:
+    """Render the ASS header for a preset (cached; presets never change)"""
+    preset = dict(preset_items)
+
+    # Position mapping
+    position_map = {
+        'bottom': 2,    # Bottom center
+        'lower': 2,     # Lower area (uses custom margin)
+        'center': 5,    # Middle center
+        'top': 8        # Top center
+    }
+
+    alignment = position_map.get(preset.get('position', 'bottom'), 2)
+    margin_v = preset.get('margin_v', 120 if alignment == 2 else 10)
+
+    header = f"""[Script Info]
+Title: Clipper Auto-Generated Captions
+ScriptType: v4.00+
+WrapStyle: 2
+PlayResX: 1080
+PlayResY: 1920
+ScaledBorderAndShadow: yes
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,{preset.get('font', 'Arial')},{preset.get('size', 24)},{preset.get('color', '&HFFFFFF&')},&H000000FF,&H00000000,&H80000000,-1,0,0,0,100,100,0,0,1,{preset.get('outline', 2)},{preset.get('shadow', 0)},{alignment},40,40,{margin_v},1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+    return header
+
 
 class CaptionGenerator:
     """Generate ASS subtitle files for video captions"""
@@ -88,66 +136,38 @@ class CaptionGenerator:
 
         gap = 0.05  # 50ms gap between captions for clean transition
 
-        for i in range(len(segments) - 1):
-            next_start = segments[i + 1]['start']
-            # End current segment before next one starts (with gap)
-            max_duration = next_start - segments[i]['start'] - gap
-            if segments[i]['duration'] > max_duration:
-                segments[i]['duration'] = max(0.1, max_duration)
+        starts = np.array([seg['start'] for seg in segments], dtype=np.float64)
+        durations = np.array([seg['duration'] for seg in segments], dtype=np.float64)
+
+        # End each segment before the next one starts (with gap); the last is unbounded
+        max_durations = np.diff(starts, append=np.inf) - gap
+        durations = np.where(durations > max_durations, np.maximum(0.1, max_durations), durations)
+
+        for seg, duration in zip(segments, durations.tolist()):
+            seg['duration'] = duration
 
         return segments
     
     def _create_ass_header(self) -> str:
         """Create ASS file header with styling"""
-
-        # Position mapping
-        position_map = {
-            'bottom': 2,    # Bottom center
-            'lower': 2,     # Lower area (uses custom margin)
-            'center': 5,    # Middle center
-            'top': 8        # Top center
-        }
-
-        alignment = position_map.get(self.preset.get('position', 'bottom'), 2)
-        margin_v = self.preset.get('margin_v', 120 if alignment == 2 else 10)
-
-        header = f"""[Script Info]
-Title: Clipper Auto-Generated Captions
-ScriptType: v4.00+
-WrapStyle: 2
-PlayResX: 1080
-PlayResY: 1920
-ScaledBorderAndShadow: yes
-
-[V4+ Styles]
-Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-Style: Default,{self.preset.get('font', 'Arial')},{self.preset.get('size', 24)},{self.preset.get('color', '&HFFFFFF&')},&H000000FF,&H00000000,&H80000000,-1,0,0,0,100,100,0,0,1,{self.preset.get('outline', 2)},{self.preset.get('shadow', 0)},{alignment},40,40,{margin_v},1
-
-[Events]
-Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
-"""
-        return header
+        return _render_ass_header(tuple(sorted(self.preset.items())))
     
     @staticmethod
     def _clean_caption_text(text: str) -> str:
         """Clean and format caption text from auto-generated transcripts"""
-        import re
-
-        text = text.replace('\n', ' ').strip()
+        text = text.translate(_NEWLINE_TO_SPACE).strip()
 
         # Remove filler artifacts common in auto-captions
-        text = re.sub(r'\[.*?\]', '', text)  # [Music], [Applause], etc.
+        if '[' in text:
+            text = _BRACKET_RE.sub('', text)  # [Music], [Applause], etc.
 
-        # Capitalize first letter of each sentence
-        text = re.sub(r'(^|[.!?]\s+)([a-z])', lambda m: m.group(1) + m.group(2).upper(), text)
+        # Capitalize first letter of each sentence and standalone "i" in one pass
+        text = _CAPITALIZE_RE.sub(_capitalize_match, text)
 
         # Capitalize the very first character
         if text and text[0].islower():
             text = text[0].upper() + text[1:]
 
-        # Capitalize "I" when standalone
-        text = re.sub(r'\bi\b', 'I', text)
-
         return text.strip()
 
     def _create_dialogue_line(self, text: str, start: float, duration: float) -> str:
@@ -176,10 +196,10 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
     @staticmethod
     def _seconds_to_ass_time(seconds: float) -> str:
         """Convert seconds to ASS time format (H:MM:SS.CC)"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        centiseconds = int((seconds % 1) * 100)
+        centiseconds = int(seconds * 100 + 0.5)
+        hours, centiseconds = divmod(centiseconds, 360000)
+        minutes, centiseconds = divmod(centiseconds, 6000)
+        secs, centiseconds = divmod(centiseconds, 100)
         
         return f"{hours}:{minutes:02d}:{secs:02d}.{centiseconds:02d}"
 
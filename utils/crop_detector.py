@@ -1,15 +1,64 @@
+import atexit
+import bisect
+import os
+import queue
 import subprocess
 import re
+import threading
 import cv2
 import numpy as np
 from pathlib import Path
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from typing import Optional, Tuple, List
+from config import FFMPEG_HWACCEL, FACE_SAMPLE_KEYFRAMES
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Every FFmpeg pass here puts -ss before -i: the demuxer jumps straight to the
+# keyframe preceding the target, so only that GOP is decoded, and frames before
+# the target are dropped inside FFmpeg without ever reaching Python.
+
+_CROP_RE = re.compile(r'crop=(\d+):(\d+):(\d+):(\d+)')
+
+# Frame width cropdetect analyzes at (wider sources are downscaled first)
+CROPDETECT_WIDTH = 480
+# Consecutive identical cropdetect results treated as settled
+CROPDETECT_STABLE_COUNT = 5
+# Seconds from the segment start that cropdetect analyzes
+CROPDETECT_DURATION = 2
+
+# Frame width handed to MediaPipe; its face model runs at 128x128 anyway, so
+# larger frames only add resize work inside detect()
+MEDIAPIPE_INPUT_WIDTH = 256
+# MediaPipe support at which hybrid detection trusts faces alone
+HYBRID_CONFIDENT_FACES = 5
+HYBRID_CONFIDENT_SCORE = 0.85
+
+# Frame width handed to YuNet; small faces stay detectable at this size
+YUNET_INPUT_WIDTH = 640
+
+# Bytes per pixel for the raw frame formats requested from FFmpeg
+_PIX_CHANNELS = {'gray': 1, 'rgb24': 3, 'bgr24': 3}
+
 MODEL_PATH = Path(__file__).parent.parent / "models" / "blaze_face_short_range.tflite"
+YUNET_MODEL_PATH = Path(__file__).parent.parent / "models" / "face_detection_yunet_2023mar.onnx"
+
+
+def _weighted_median(values, weights) -> float:
+    """
+    Value at which the cumulative weight (in value order) reaches half the total
+
+    Unlike a weighted mean, a single confident outlier (e.g. a face on a
+    poster at the frame edge) can't drag the result away from the subject.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    order = np.argsort(values, kind='stable')
+    cumulative = np.cumsum(weights[order])
+    return float(values[order][np.searchsorted(cumulative, cumulative[-1] / 2)])
 
 
 class CropDetector:
@@ -19,6 +68,14 @@ class CropDetector:
         self.face_detection_enabled = face_detection_enabled
         self.use_mediapipe = use_mediapipe
 
+        # ffprobe results per video path, shared by every detection method
+        self._probe_cache = {}
+
+        # MediaPipe detectors: every one created, and those not currently in use
+        self._mp_detectors = []
+        self._mp_idle = queue.SimpleQueue()
+        atexit.register(self.close)
+
         # Try loading MediaPipe tasks API
         self.mp_vision = None
         self.mp_base_options = None
@@ -44,9 +101,15 @@ class CropDetector:
                 logger.warning(f"Failed to initialize MediaPipe: {e}, falling back to OpenCV")
                 self.use_mediapipe = False
 
-        # Fallback to OpenCV Haar Cascade if MediaPipe fails or is disabled
+        # Fallback to OpenCV if MediaPipe fails or is disabled: the YuNet DNN
+        # detector when its model is present, otherwise the Haar Cascade
+        self.use_yunet = False
         self.face_cascade = None
         if face_detection_enabled and not self.use_mediapipe:
+            if YUNET_MODEL_PATH.exists() and hasattr(cv2, 'FaceDetectorYN'):
+                self.use_yunet = True
+                logger.info("OpenCV YuNet face detection initialized")
+        if face_detection_enabled and not self.use_mediapipe and not self.use_yunet:
             try:
                 cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
                 self.face_cascade = cv2.CascadeClassifier(cascade_path)
@@ -128,172 +191,406 @@ class CropDetector:
     
     def _center_crop(self, video_path: str) -> int:
         """Get center crop position"""
+        return self._frame_width(video_path) // 2
+
+    def _frame_width(self, video_path: str) -> int:
+        """Source frame width, from the cached probe when possible"""
+        probe = self._probe_video(video_path)
+        if probe:
+            return probe[0]
+
         cap = cv2.VideoCapture(video_path)
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         cap.release()
-        
-        return width // 2
+        return width
     
     def _cropdetect_method(self, video_path: str, start_time: float) -> Optional[int]:
         """Use FFmpeg cropdetect to find crop position"""
         try:
+            vf, scale = self._cropdetect_filter(video_path)
+
             cmd = [
                 'ffmpeg',
                 '-ss', str(start_time),
                 '-i', video_path,
-                '-t', '2',  # Analyze 2 seconds
-                '-vf', 'cropdetect=24:16:0',
+                '-t', str(CROPDETECT_DURATION),
+                '-an', '-sn',
+                '-vf', vf,
+                '-threads', '0',
                 '-f', 'null',
                 '-'
             ]
             
-            result = subprocess.run(
+            # Stream FFmpeg's log and stop as soon as the detected crop settles
+            proc = subprocess.Popen(
                 cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1
             )
             
-            # Extract crop values: crop=w:h:x:y
-            matches = re.findall(r'crop=(\d+):(\d+):(\d+):(\d+)', result.stdout)
-            
-            if matches:
-                # Get the most common crop value (last one usually most stable)
-                width, height, x, y = matches[-1]
-                logger.info(f"Cropdetect found: crop={width}:{height}:{x}:{y}")
-                return int(x) + int(width) // 2  # Return center of detected crop
-            
-            return None
+            try:
+                return self._parse_cropdetect(proc.stderr, scale)
+            finally:
+                proc.stderr.close()
+                if proc.poll() is None:
+                    proc.terminate()
+                proc.wait()
             
         except Exception as e:
             logger.error(f"Cropdetect failed: {e}")
             return None
-    
-    def _mediapipe_face_detection(self, video_path: str, start_time: float,
-                                  duration: float) -> Optional[int]:
+
+    def _cropdetect_filter(self, video_path: str) -> Tuple[str, float]:
         """
-        Use MediaPipe face detection (tasks API) for optimal crop position
-        More accurate than Haar Cascades, provides confidence scores
+        Build the cropdetect filter chain for a video
+
+        Analysis runs at reduced resolution: cropdetect's cost is per pixel and
+        the borders it finds scale back linearly.
+
+        Returns:
+            Tuple of (filter chain, factor mapping detected x back to source pixels)
         """
+        probe = self._probe_video(video_path)
+        vf = 'cropdetect=24:16:0'
+        if probe and probe[0] > CROPDETECT_WIDTH:
+            return f'scale={CROPDETECT_WIDTH}:-2,{vf}', probe[0] / CROPDETECT_WIDTH
+        return vf, 1.0
+
+    def _parse_cropdetect(self, lines, scale: float) -> Optional[int]:
+        """Center x of the crop cropdetect settles on in FFmpeg log `lines`, if any"""
+        last_match = None
+        repeats = 0
+        for line in lines:
+            # Extract crop values: crop=w:h:x:y
+            match = _CROP_RE.search(line)
+            if not match:
+                continue
+            if match.groups() == last_match:
+                repeats += 1
+            else:
+                last_match, repeats = match.groups(), 1
+            if repeats >= CROPDETECT_STABLE_COUNT:
+                break
+
+        if last_match:
+            # Use the latest (most stable) crop value
+            width, height, x, y = last_match
+            logger.info(f"Cropdetect found: crop={width}:{height}:{x}:{y}")
+            return int((int(x) + int(width) // 2) * scale)  # Return center of detected crop
+
+        return None
+    
+    def _probe_video(self, video_path: str) -> Optional[Tuple[int, int, float]]:
+        """Get (width, height, fps) of the first video stream using ffprobe (cached per path)"""
+        if video_path in self._probe_cache:
+            return self._probe_cache[video_path]
+
+        cmd = [
+            'ffprobe',
+            '-v', 'error',
+            '-select_streams', 'v:0',
+            '-show_entries', 'stream=width,height,avg_frame_rate',
+            '-of', 'csv=p=0',
+            video_path
+        ]
         try:
-            FaceDetector = self.mp_vision['FaceDetector']
-            FaceDetectorOptions = self.mp_vision['FaceDetectorOptions']
-            BaseOptions = self.mp_vision['BaseOptions']
-            MPImage = self.mp_vision['Image']
-            ImageFormat = self.mp_vision['ImageFormat']
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            width, height, rate = result.stdout.strip().splitlines()[0].split(',')[:3]
+            num, _, den = rate.partition('/')
+            fps = float(num) / float(den or 1) if float(den or 1) else 0
+            probe = int(width), int(height), fps or 30
+            self._probe_cache[video_path] = probe
+            return probe
+        except Exception as e:
+            logger.error(f"ffprobe failed: {e}")
+            return None
 
-            face_positions = []
-            confidences = []
+    def _iter_sampled_frames(self, video_path: str, start_time: float, duration: float,
+                             sample_interval: int, pix_fmt: str = 'bgr24',
+                             max_width: int = None, probe: tuple = None,
+                             crop_lines: list = None):
+        """
+        Yield every `sample_interval`-th frame in [start_time, start_time + duration]
 
-            cap = cv2.VideoCapture(video_path)
-            cap.set(cv2.CAP_PROP_POS_MSEC, start_time * 1000)
+        FFmpeg decodes the segment (on the GPU when FFMPEG_HWACCEL allows) and
+        only hands the selected frames over a pipe, already converted to
+        `pix_fmt`, so skipped frames never reach Python. With
+        FACE_SAMPLE_KEYFRAMES set, only keyframes are decoded and yielded.
 
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            if fps == 0:
-                fps = 30
-            total_frames = int(duration * fps)
-            frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        Args:
+            max_width: Downscale wider frames to this width (aspect preserved)
+            probe: (width, height, fps) from _probe_video, if already known
+            crop_lines: If given, cropdetect runs on the same decode (a split
+                filter branch) and its log lines are appended here
 
-            sample_interval = 15
+        Yields:
+            uint8 arrays of shape (height, width) for 'gray', else (height, width, 3)
+        """
+        probe = probe or self._probe_video(video_path)
+        if probe is None:
+            return
+        width, height, fps = probe
 
-            options = FaceDetectorOptions(
-                base_options=BaseOptions(model_asset_path=str(MODEL_PATH)),
-                min_detection_confidence=0.5,
-            )
+        # Keyframe-only decoding skips the inter-frame prediction work; the
+        # sample spacing then follows the source GOP instead of the interval
+        filters = [] if FACE_SAMPLE_KEYFRAMES else [f"select='not(mod(n\\,{sample_interval}))'"]
+        crop_filter = self._cropdetect_filter(video_path)[0] if crop_lines is not None else None
+        if max_width and width > max_width:
+            height = max(2, round(height * max_width / width / 2) * 2)
+            width = max_width
+            filters.append(f'scale={width}:{height}')
 
-            with FaceDetector.create_from_options(options) as detector:
-                frame_count = 0
-                samples_taken = 0
+        max_frames = -(-int(duration * fps) // sample_interval)
+        if max_frames <= 0:
+            return
 
-                while frame_count < total_frames:
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
+        channels = _PIX_CHANNELS[pix_fmt]
+        frame_size = width * height * channels
+        shape = (height, width) if channels == 1 else (height, width, channels)
 
-                    if frame_count % sample_interval == 0:
-                        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        mp_image = MPImage(image_format=ImageFormat.SRGB, data=rgb_frame)
+        cmd = ['ffmpeg', '-v', 'error' if crop_filter is None else 'info', '-nostats',
+               '-noautorotate']
+        if FFMPEG_HWACCEL and FFMPEG_HWACCEL != 'none':
+            # Decoded frames are copied back to system memory for the pipe
+            cmd += ['-hwaccel', FFMPEG_HWACCEL]
+        if FACE_SAMPLE_KEYFRAMES:
+            cmd += ['-skip_frame', 'nokey']
+        cmd += ['-ss', str(start_time), '-t', str(duration), '-i', video_path]
+        if crop_filter is None:
+            cmd += ['-vf', ','.join(filters or ['null'])]
+        else:
+            cmd += [
+                '-filter_complex',
+                f"[0:v]split[f][c];[f]{','.join(filters or ['null'])}[frames];"
+                f"[c]trim=duration={CROPDETECT_DURATION},{crop_filter}[crop]",
+                '-map', '[frames]'
+            ]
+        cmd += [
+            '-vsync', 'vfr',
+            '-frames:v', str(max_frames),
+            '-an', '-sn',
+            '-f', 'rawvideo', '-pix_fmt', pix_fmt,
+            'pipe:1'
+        ]
+        if crop_filter is not None:
+            cmd += ['-map', '[crop]', '-f', 'null', '-']
 
-                        result = detector.detect(mp_image)
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL if crop_filter is None else subprocess.PIPE
+        )
 
-                        for detection in result.detections:
-                            bbox = detection.bounding_box
-                            x_center = bbox.origin_x + bbox.width / 2
-                            confidence = detection.categories[0].score
+        # Drain the cropdetect log alongside the frames so neither pipe stalls
+        drain = None
+        if crop_filter is not None:
+            def collect_crop_lines():
+                for line in proc.stderr:
+                    if b'crop=' in line:
+                        crop_lines.append(line.decode(errors='replace'))
+            drain = threading.Thread(target=collect_crop_lines, daemon=True)
+            drain.start()
 
-                            face_positions.append(x_center)
-                            confidences.append(confidence)
-                            logger.debug(f"MediaPipe face: x={x_center:.1f}, conf={confidence:.2f}")
+        exhausted = False
+        try:
+            while True:
+                buf = bytearray(frame_size)
+                if proc.stdout.readinto(buf) < frame_size:
+                    exhausted = True
+                    break
+                yield np.frombuffer(buf, dtype=np.uint8).reshape(shape)
+        finally:
+            proc.stdout.close()
+            if drain is not None:
+                # Let the cropdetect branch finish its short window unless the
+                # caller abandoned the frames early
+                if not exhausted and proc.poll() is None:
+                    proc.kill()
+                drain.join()
+                proc.stderr.close()
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
 
-                        samples_taken += 1
+    @contextmanager
+    def _mediapipe_detector(self):
+        """
+        Check out a MediaPipe FaceDetector for the duration of one call
 
-                    frame_count += 1
+        Building a detector loads the model, so detectors are reused across
+        calls; detect() isn't thread-safe, so each is used by one call at a time.
+        """
+        try:
+            detector = self._mp_idle.get_nowait()
+        except queue.Empty:
+            options = self.mp_vision['FaceDetectorOptions'](
+                base_options=self.mp_vision['BaseOptions'](model_asset_path=str(MODEL_PATH)),
+                min_detection_confidence=0.5,
+            )
+            detector = self.mp_vision['FaceDetector'].create_from_options(options)
+            self._mp_detectors.append(detector)
+        try:
+            yield detector
+        finally:
+            self._mp_idle.put(detector)
 
-            cap.release()
+    def close(self):
+        """Release the MediaPipe detectors created so far"""
+        while self._mp_detectors:
+            self._mp_detectors.pop().close()
+        self._mp_idle = queue.SimpleQueue()
 
-            if face_positions:
-                valid_pairs = [(pos, conf) for pos, conf in zip(face_positions, confidences) if conf > 0.6]
-                if valid_pairs:
-                    positions, weights = zip(*valid_pairs)
-                    optimal_x = int(np.average(positions, weights=weights))
-                else:
-                    optimal_x = int(np.median(face_positions))
+    def _mediapipe_face_detection(self, video_path: str, start_time: float,
+                                  duration: float, crop_lines: list = None) -> Optional[int]:
+        """
+        Use MediaPipe face detection (tasks API) for optimal crop position
+        More accurate than Haar Cascades, provides confidence scores
 
-                logger.info(f"MediaPipe found optimal position: {optimal_x} "
-                          f"(from {len(face_positions)} faces in {samples_taken} frames)")
-                return optimal_x
+        `crop_lines` fuses a cropdetect pass into the same decode (see _iter_sampled_frames)
+        """
+        found = self._mediapipe_face_detection_ex(video_path, start_time, duration, crop_lines)
+        return found[0] if found else None
 
-            logger.info("No faces detected with MediaPipe in video segment")
-            return None
+    def _mediapipe_face_detection_ex(self, video_path: str, start_time: float, duration: float,
+                                     crop_lines: list = None) -> Optional[Tuple[int, int, float]]:
+        """
+        MediaPipe face detection that also reports how well-supported the result is
+
+        Returns:
+            Tuple of (x_position, faces_detected, mean_confidence), or None
+        """
+        try:
+            scan = self._mediapipe_scan(video_path, start_time, duration, crop_lines)
+            if scan is None:
+                return None
+            detections, frame_times = scan
+            return self._settle_mediapipe(detections, len(frame_times))
 
         except Exception as e:
             logger.error(f"MediaPipe face detection failed: {e}")
             return None
+
+    def _mediapipe_scan(self, video_path: str, start_time: float, duration: float,
+                        crop_lines: list = None) -> Optional[Tuple[list, list]]:
+        """
+        Run MediaPipe over the sampled frames of a segment
+
+        Returns:
+            Tuple of (detections as (time, x_center, confidence), sampled frame
+            times), or None if the video can't be probed
+        """
+        MPImage = self.mp_vision['Image']
+        ImageFormat = self.mp_vision['ImageFormat']
+
+        detections = []
+        frame_times = []
+
+        sample_interval = 15
+
+        # Frames arrive downscaled; map detections back to source pixels
+        probe = self._probe_video(video_path)
+        if probe is None:
+            return None
+        scale = probe[0] / min(probe[0], MEDIAPIPE_INPUT_WIDTH)
+        frame_step = sample_interval / probe[2]
+
+        with self._mediapipe_detector() as detector:
+            for rgb_frame in self._iter_sampled_frames(video_path, start_time, duration,
+                                                       sample_interval, pix_fmt='rgb24',
+                                                       max_width=MEDIAPIPE_INPUT_WIDTH,
+                                                       probe=probe, crop_lines=crop_lines):
+                time = start_time + len(frame_times) * frame_step
+                frame_times.append(time)
+
+                mp_image = MPImage(image_format=ImageFormat.SRGB, data=rgb_frame)
+
+                result = detector.detect(mp_image)
+
+                for detection in result.detections:
+                    bbox = detection.bounding_box
+                    x_center = (bbox.origin_x + bbox.width / 2) * scale
+                    confidence = detection.categories[0].score
+
+                    detections.append((time, x_center, confidence))
+                    logger.debug(f"MediaPipe face: x={x_center:.1f}, conf={confidence:.2f}")
+
+        return detections, frame_times
+
+    def _settle_mediapipe(self, detections: list,
+                          samples_taken: int) -> Optional[Tuple[int, int, float]]:
+        """Crop position from (time, x_center, confidence) MediaPipe detections"""
+        if detections:
+            _, face_positions, confidences = zip(*detections)
+            valid_pairs = [(pos, conf) for pos, conf in zip(face_positions, confidences) if conf > 0.6]
+            if valid_pairs:
+                positions, weights = zip(*valid_pairs)
+                optimal_x = int(_weighted_median(positions, weights))
+            else:
+                optimal_x = int(np.median(face_positions))
+
+            logger.info(f"MediaPipe found optimal position: {optimal_x} "
+                      f"(from {len(face_positions)} faces in {samples_taken} frames)")
+            return optimal_x, len(face_positions), float(np.mean(confidences))
+
+        logger.info("No faces detected with MediaPipe in video segment")
+        return None
     
     def _face_detection_method(self, video_path: str, start_time: float, 
-                               duration: float) -> Optional[int]:
-        """Use OpenCV Haar Cascade face detection (fallback method)"""
+                               duration: float, crop_lines: list = None) -> Optional[int]:
+        """
+        Use OpenCV face detection, YuNet or Haar Cascade (fallback method)
+
+        `crop_lines` fuses a cropdetect pass into the same decode (see _iter_sampled_frames)
+        """
         try:
-            cap = cv2.VideoCapture(video_path)
-            
-            # Set starting position
-            cap.set(cv2.CAP_PROP_POS_MSEC, start_time * 1000)
-            
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            total_frames = int(duration * fps)
-            
             # Sample every 30 frames (approximately 1 per second at 30fps)
             sample_interval = 30
             face_positions = []
             
-            frame_count = 0
+            # Created per call like the MediaPipe detector: detect() isn't
+            # safe to share between clips processed on different threads
+            yunet = None
+            if self.use_yunet:
+                yunet = cv2.FaceDetectorYN.create(
+                    str(YUNET_MODEL_PATH), '', (320, 320),
+                    backend_id=cv2.dnn.DNN_BACKEND_OPENCV,
+                    target_id=cv2.dnn.DNN_TARGET_CPU
+                )
             
-            while frame_count < total_frames:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                if frame_count % sample_interval == 0:
-                    # Convert to grayscale for face detection
-                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                    
-                    # Detect faces
+            # Both detectors get downscaled frames, mapped back via `scale`:
+            # YuNet a fixed width, the Haar cascade half size (with its
+            # minSize halved so the smallest detectable face is unchanged)
+            probe = self._probe_video(video_path)
+            if probe is None:
+                return None
+            max_width = YUNET_INPUT_WIDTH if yunet else max(2, probe[0] // 4 * 2)
+            scale = probe[0] / min(probe[0], max_width)
+            min_face = max(1, round(30 / scale))
+
+            for frame in self._iter_sampled_frames(video_path, start_time, duration, sample_interval,
+                                                   pix_fmt='bgr24' if yunet else 'gray',
+                                                   max_width=max_width, probe=probe,
+                                                   crop_lines=crop_lines):
+                # Detect faces as (x, y, w, h) boxes
+                if yunet:
+                    yunet.setInputSize((frame.shape[1], frame.shape[0]))
+                    _, detections = yunet.detect(frame)
+                    faces = detections[:, :4] if detections is not None else []
+                else:
                     faces = self.face_cascade.detectMultiScale(
-                        gray,
+                        frame,
                         scaleFactor=1.1,
                         minNeighbors=5,
-                        minSize=(30, 30)
+                        minSize=(min_face, min_face)
                     )
-                    
-                    if len(faces) > 0:
-                        # Calculate center of all detected faces
-                        centers = [x + w/2 for (x, y, w, h) in faces]
-                        avg_center = np.mean(centers)
-                        face_positions.append(avg_center)
                 
-                frame_count += 1
-            
-            cap.release()
+                if len(faces) > 0:
+                    # Calculate center of all detected faces
+                    boxes = np.asarray(faces, dtype=np.float64)
+                    avg_center = (boxes[:, 0] + boxes[:, 2] / 2).mean() * scale
+                    face_positions.append(avg_center)
             
             if face_positions:
                 # Return median face position (more robust than mean)
@@ -316,21 +613,32 @@ class CropDetector:
         Uses MediaPipe + cropdetect + temporal consistency check
         """
         candidates = []
+        # Cropdetect log from the face detection decode (one FFmpeg pass for both)
+        crop_lines = []
         
         # Method 1: MediaPipe face detection
         if self.face_detection_enabled and self.use_mediapipe:
-            mp_pos = self._mediapipe_face_detection(video_path, start_time, duration)
-            if mp_pos is not None:
+            found = self._mediapipe_face_detection_ex(video_path, start_time, duration,
+                                                      crop_lines=crop_lines)
+            if found is not None:
+                mp_pos, faces, confidence = found
+                # Plenty of confident faces: cropdetect can't improve on it
+                if faces >= HYBRID_CONFIDENT_FACES and confidence >= HYBRID_CONFIDENT_SCORE:
+                    return mp_pos, 'mediapipe(confident)'
                 candidates.append((mp_pos, 1.0, 'mediapipe'))  # Weight: 1.0
         
         # Method 2: OpenCV face detection (if MediaPipe disabled/failed)
         if self.face_detection_enabled and not self.use_mediapipe:
-            cv_pos = self._face_detection_method(video_path, start_time, duration)
+            cv_pos = self._face_detection_method(video_path, start_time, duration,
+                                                 crop_lines=crop_lines)
             if cv_pos is not None:
                 candidates.append((cv_pos, 0.8, 'opencv'))  # Weight: 0.8
         
-        # Method 3: FFmpeg cropdetect
-        cd_pos = self._cropdetect_method(video_path, start_time)
+        # Method 3: FFmpeg cropdetect, reusing the fused pass when it ran
+        if crop_lines:
+            cd_pos = self._parse_cropdetect(crop_lines, self._cropdetect_filter(video_path)[1])
+        else:
+            cd_pos = self._cropdetect_method(video_path, start_time)
         if cd_pos is not None:
             candidates.append((cd_pos, 0.6, 'cropdetect'))  # Weight: 0.6
         
@@ -344,9 +652,7 @@ class CropDetector:
             max_diff = max(positions) - min(positions)
             
             # If methods agree within 20% of frame width, average them
-            cap = cv2.VideoCapture(video_path)
-            frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            cap.release()
+            frame_width = self._frame_width(video_path)
             
             if max_diff < frame_width * 0.2:
                 # Weighted average
@@ -360,28 +666,88 @@ class CropDetector:
         best = max(candidates, key=lambda x: x[1])
         return best[0], best[2]
     
+    def _detect_segments_batched(self, video_path: str,
+                                 segments: List[Tuple[float, float]]) -> List[Tuple[int, str]]:
+        """
+        'auto' detection for many segments with one MediaPipe decode per run of
+        adjacent or overlapping segments; detections are bucketed back by time
+        """
+        spans = []
+        for start, end in sorted((start, start + duration) for start, duration in segments):
+            if spans and start <= spans[-1][1]:
+                spans[-1][1] = max(spans[-1][1], end)
+            else:
+                spans.append([start, end])
+
+        def scan(span):
+            try:
+                return self._mediapipe_scan(video_path, span[0], span[1] - span[0])
+            except Exception as e:
+                logger.error(f"MediaPipe face detection failed: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(len(spans), os.cpu_count() or 1)) as executor:
+            scans = [result for result in executor.map(scan, spans) if result]
+
+        detections = sorted(d for found, _ in scans for d in found)
+        detection_times = [d[0] for d in detections]
+        frame_times = sorted(t for _, times in scans for t in times)
+
+        raw_positions = []
+        for start, duration in segments:
+            end = start + duration
+            lo = bisect.bisect_left(detection_times, start)
+            hi = bisect.bisect_left(detection_times, end)
+            samples = bisect.bisect_left(frame_times, end) - bisect.bisect_left(frame_times, start)
+
+            found = self._settle_mediapipe(detections[lo:hi], samples)
+            if found:
+                raw_positions.append((found[0], 'mediapipe'))
+                continue
+
+            # Same fallback chain as detect_crop_position's 'auto'
+            x_pos = self._cropdetect_method(video_path, start)
+            if x_pos is not None:
+                raw_positions.append((x_pos, 'cropdetect'))
+            else:
+                raw_positions.append((self._center_crop(video_path), 'center'))
+
+        return raw_positions
+
     def detect_with_temporal_smoothing(self, video_path: str, segments: List[Tuple[float, float]], 
                                        window_size: int = 3) -> List[Tuple[int, str]]:
         """
         Detect crop positions for multiple segments with temporal smoothing
         Prevents jarring jumps between adjacent segments
         """
-        raw_positions = []
-        
-        for start, duration in segments:
-            x_pos, method = self.detect_crop_position(video_path, start, duration, method='auto')
-            raw_positions.append((x_pos, method))
+        if not segments:
+            return []
+
+        if self.face_detection_enabled and self.use_mediapipe and not FACE_SAMPLE_KEYFRAMES:
+            raw_positions = self._detect_segments_batched(video_path, segments)
+        else:
+            # Segments are independent FFmpeg/detector runs (detectors are
+            # checked out per call), so analyze them concurrently
+            workers = min(len(segments), os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                raw_positions = list(executor.map(
+                    lambda seg: self.detect_crop_position(video_path, seg[0], seg[1], method='auto'),
+                    segments
+                ))
         
-        # Apply moving average smoothing
+        # Apply moving average smoothing: windows are clipped at the ends, so
+        # average via prefix sums rather than a zero-padded convolution
+        positions = np.array([p[0] for p in raw_positions], dtype=np.float64)
+        n = len(positions)
+        half = window_size // 2
+        prefix = np.concatenate(([0.0], np.cumsum(positions)))
+        idx = np.arange(n)
+        lo = np.maximum(idx - half, 0)
+        hi = np.minimum(idx + half + 1, n)
+        averages = ((prefix[hi] - prefix[lo]) / (hi - lo)).astype(np.int64)
+
         smoothed = []
-        for i, (pos, method) in enumerate(raw_positions):
-            # Get window
-            start_idx = max(0, i - window_size // 2)
-            end_idx = min(len(raw_positions), i + window_size // 2 + 1)
-            window = raw_positions[start_idx:end_idx]
-            
-            # Average positions
-            avg_pos = int(np.mean([p[0] for p in window]))
+        for i, ((pos, method), avg_pos) in enumerate(zip(raw_positions, averages.tolist())):
             smoothed.append((avg_pos, method))
             
             if abs(avg_pos - pos) > 50:  # Log significant changes
@@ -0,0 +1,105 @@
+import re
+import subprocess
+import logging
+from functools import lru_cache
+from config import FFMPEG_ENCODER, FFMPEG_PRESET, FFMPEG_TUNE, FFMPEG_CRF
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Hardware H.264 encoders, in order of preference
+HW_ENCODERS = ('h264_nvenc', 'h264_videotoolbox', 'h264_qsv', 'h264_vaapi')
+# DRM render node used by h264_vaapi
+VAAPI_DEVICE = '/dev/dri/renderD128'
+
+
+@lru_cache(maxsize=None)
+def _encoder_works(encoder: str) -> bool:
+    """Whether FFmpeg can open `encoder` (builds list encoders whose device is missing)"""
+    cmd = [
+        'ffmpeg', '-v', 'error',
+        '-f', 'lavfi', '-i', 'color=size=256x256:duration=0.1',
+        '-frames:v', '1',
+    ]
+    if hw_upload_filter(encoder):
+        cmd += ['-vf', hw_upload_filter(encoder).lstrip(',')]
+    cmd += [*h264_encoder_args(encoder), '-f', 'null', '-']
+    try:
+        return subprocess.run(cmd, capture_output=True, timeout=30).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+@lru_cache(maxsize=None)
+def h264_encoder() -> str:
+    """
+    H.264 encoder to use for re-encodes
+
+    FFMPEG_ENCODER when set explicitly; with 'auto', the first hardware encoder
+    that actually works on this machine, otherwise libx264. Probed once per run.
+    """
+    if FFMPEG_ENCODER != 'auto':
+        return FFMPEG_ENCODER
+
+    try:
+        listed = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'],
+                                capture_output=True, text=True).stdout
+    except OSError:
+        return 'libx264'
+
+    for encoder in HW_ENCODERS:
+        if f' {encoder} ' in listed and _encoder_works(encoder):
+            logger.info(f"Using hardware encoder: {encoder}")
+            return encoder
+    return 'libx264'
+
+
+def h264_encoder_args(encoder: str, crf: int = FFMPEG_CRF, preset: str = FFMPEG_PRESET,
+                      tune: str = FFMPEG_TUNE) -> list:
+    """
+    FFmpeg video codec arguments for `encoder` at roughly the quality of libx264 `crf`
+
+    Args:
+        encoder: Encoder name, e.g. from h264_encoder()
+        crf: libx264 CRF (mapped to each hardware encoder's quality scale)
+        preset: libx264 preset (hardware encoders use their own)
+        tune: libx264 tune, or empty for none
+
+    Returns:
+        List of FFmpeg output arguments selecting and configuring the encoder
+    """
+    if encoder == 'h264_nvenc':
+        return ['-c:v', encoder, '-preset', 'p5', '-tune', 'hq', '-rc', 'vbr', '-cq', str(crf)]
+    if encoder == 'h264_videotoolbox':
+        return ['-c:v', encoder, '-q:v', '60']
+    if encoder == 'h264_qsv':
+        return ['-c:v', encoder, '-global_quality', str(crf)]
+    if encoder == 'h264_vaapi':
+        return ['-vaapi_device', VAAPI_DEVICE, '-c:v', encoder, '-qp', str(crf)]
+    args = ['-c:v', encoder, '-preset', preset, '-crf', str(crf)]
+    if tune:
+        args += ['-tune', tune]
+    return args
+
+
+def hw_upload_filter(encoder: str) -> str:
+    """
+    Filter chain suffix moving frames onto the GPU for `encoder`
+
+    VAAPI encodes from GPU surfaces, so software-filtered frames have to be
+    uploaded first; other encoders take system-memory frames as they are.
+    """
+    if encoder == 'h264_vaapi':
+        return ',format=nv12,hwupload'
+    return ''
+
+
+def escape_filter_value(value: str) -> str:
+    """
+    Escape a filter option value (e.g. a file path) for use in a -vf filtergraph
+
+    FFmpeg unescapes twice: once for the option value (\\ ' :) and once
+    for the filtergraph itself (\\ ' [ ] , ;).
+    """
+    value = re.sub(r"([\\':])", r"\\\1", value)
+    return re.sub(r"([\\'\[\],;])", r"\\\1", value)
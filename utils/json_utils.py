@@ -0,0 +1,21 @@
+import json
+
+# orjson is optional: it parses and serializes several times faster than the
+# stdlib json module, which is used as the fallback
+try:
+    import orjson
+
+    def json_loads(data):
+        """Parse JSON from str or bytes"""
+        return orjson.loads(data)
+
+    def json_dumps(obj, indent=None):
+        """Serialize to a JSON string (indent is 2 spaces when set)"""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode('utf-8')
+
+except ImportError:
+    json_loads = json.loads
+
+    def json_dumps(obj, indent=None):
+        """Serialize to a JSON string (indent is 2 spaces when set)"""
+        return json.dumps(obj, indent=2 if indent else None)
@@ -1,8 +1,9 @@
-import json
 import logging
 import os
 from pathlib import Path
 from openai import OpenAI
+from llm.cache import get_cached_response, save_cached_response
+from utils.json_utils import json_loads, json_dumps
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -165,24 +166,37 @@ class SegmentAnalyzer:
             api_key=api_key,
         )
 
-    def analyze(self, srt_content: str, model: str = "openai/gpt-oss-120b:free") -> dict:
+    def analyze(self, srt_content: str, model: str = "openai/gpt-oss-120b:free",
+                use_cache: bool = True) -> dict:
         """
         Send transcript to LLM via OpenRouter and get viral segment timestamps back.
 
         Args:
             srt_content: Full transcript in SRT format
             model: OpenRouter model to use
+            use_cache: Reuse a cached response for the same model and transcript
 
         Returns:
             Dict with 'clips' list matching segments.json format
         """
-        logger.info(f"Analyzing transcript with {model}...")
-
         user_prompt = (
             "Here is the full video transcript in SRT format. "
             "Analyze it and identify the most viral-worthy segments.\n\n"
             f"```srt\n{srt_content}\n```"
         )
+        # Responses share the clip finder's on-disk LLM cache (llm/cache.py)
+        cache_prompt = f"{SYSTEM_PROMPT}\n\n{user_prompt}"
+
+        cached = get_cached_response(model, cache_prompt) if use_cache else None
+        if cached is not None:
+            try:
+                segments = json_loads(cached)
+                logger.info("Using cached LLM response")
+                return segments
+            except ValueError:
+                logger.warning("Ignoring unreadable cached LLM response")
+
+        logger.info(f"Analyzing transcript with {model}...")
 
         response = self.client.chat.completions.create(
             model=model,
@@ -191,17 +205,24 @@ class SegmentAnalyzer:
                 {"role": "user", "content": user_prompt},
             ],
             temperature=0.7,
+            response_format={"type": "json_object"},
         )
 
         # Extract JSON from response
         raw = response.choices[0].message.content.strip()
 
-        # Strip markdown code fences if present
+        # Strip markdown code fences, for providers that ignore response_format
         if raw.startswith("```"):
             lines = raw.split('\n')
             raw = '\n'.join(lines[1:-1])
 
-        segments = json.loads(raw)
+        segments = json_loads(raw)
+
+        # Saved even when use_cache is off, so a forced re-run replaces a stale entry
+        try:
+            save_cached_response(model, cache_prompt, raw)
+        except OSError as e:
+            logger.warning(f"Could not cache LLM response: {e}")
 
         clip_count = len(segments.get('clips', []))
         logger.info(f"LLM identified {clip_count} viral segments")
@@ -209,7 +230,8 @@ class SegmentAnalyzer:
         return segments
 
     def analyze_and_save(self, srt_content: str, output_path: Path,
-                         model: str = "google/gemini-2.0-flash-001") -> Path:
+                         model: str = "google/gemini-2.0-flash-001",
+                         use_cache: bool = True) -> Path:
         """
         Analyze transcript and save segments.json
 
@@ -217,14 +239,15 @@ class SegmentAnalyzer:
             srt_content: Full transcript in SRT format
             output_path: Path to save segments.json
             model: OpenRouter model to use
+            use_cache: Reuse a cached response for the same model and transcript
 
         Returns:
             Path to saved segments.json
         """
-        segments = self.analyze(srt_content, model=model)
+        segments = self.analyze(srt_content, model=model, use_cache=use_cache)
 
         output_path = Path(output_path)
-        output_path.write_text(json.dumps(segments, indent=2), encoding='utf-8')
+        output_path.write_text(json_dumps(segments, indent=2), encoding='utf-8')
         logger.info(f"Saved segments to: {output_path}")
 
         return output_path
@@ -1,7 +1,10 @@
 from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
+import bisect
+import itertools
 import logging
-import re
+import numpy as np
+from utils.video_id import extract_video_id
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -10,21 +13,13 @@ logger = logging.getLogger(__name__)
 class TranscriptFetcher:
     """Fetch transcripts from YouTube videos"""
     
+    # (transcript list, its length, time index) from the last _time_index call
+    _index_cache = None
+    
     @staticmethod
     def extract_video_id(url: str) -> str:
         """Extract video ID from YouTube URL"""
-        patterns = [
-            r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',
-            r'(?:embed\/)([0-9A-Za-z_-]{11})',
-            r'^([0-9A-Za-z_-]{11})$'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-        
-        raise ValueError(f"Could not extract video ID from URL: {url}")
+        return extract_video_id(url)
     
     def fetch_transcript(self, youtube_url: str, languages: list = None) -> list:
         """
@@ -49,13 +44,10 @@ class TranscriptFetcher:
             transcript_data = api.fetch(video_id, languages=languages)
 
             # Convert to list of dicts with expected keys
-            result = []
-            for snippet in transcript_data:
-                result.append({
-                    'text': snippet.text,
-                    'start': snippet.start,
-                    'duration': snippet.duration
-                })
+            result = [
+                {'text': snippet.text, 'start': snippet.start, 'duration': snippet.duration}
+                for snippet in transcript_data
+            ]
 
             logger.info(f"Successfully fetched transcript with {len(result)} segments")
             return result
@@ -80,12 +72,15 @@ class TranscriptFetcher:
         Returns:
             Formatted transcript string
         """
-        formatted_lines = []
+        hours, minutes, secs, _ = self._timestamp_fields(
+            [segment['start'] for segment in transcript_data]
+        )
         
-        for segment in transcript_data:
-            timestamp = self._seconds_to_timestamp(segment['start'])
-            text = segment['text'].strip()
-            formatted_lines.append(f"[{timestamp}] {text}")
+        formatted_lines = [
+            "[%02d:%02d:%02d] %s" % (h, m, sec, segment['text'].strip())
+            for h, m, sec, segment in zip(hours.tolist(), minutes.tolist(), secs.tolist(),
+                                          transcript_data)
+        ]
         
         return '\n'.join(formatted_lines)
     
@@ -101,18 +96,84 @@ class TranscriptFetcher:
         Returns:
             Transcript text for that time range
         """
-        segments = []
+        starts, ends, reach = self._time_index(transcript_data)
         
-        for segment in transcript_data:
-            seg_start = segment['start']
-            seg_end = seg_start + segment['duration']
-            
+        if starts is None:
+            # Unsorted data: fall back to checking every segment
+            return ' '.join(
+                segment['text'] for segment, seg_start, seg_end
+                in zip(transcript_data, *self._segment_bounds(transcript_data))
+                if seg_start < end_time and seg_end > start_time
+            )
+        
+        # reach[i] is the latest end among the first i+1 segments, so nothing
+        # before the first index whose reach passes start_time can overlap
+        segments = []
+        i = bisect.bisect_right(reach, start_time)
+        while i < len(starts) and starts[i] < end_time:
             # Check if segment overlaps with requested time range
-            if seg_start < end_time and seg_end > start_time:
-                segments.append(segment['text'])
+            if ends[i] > start_time:
+                segments.append(transcript_data[i]['text'])
+            i += 1
         
         return ' '.join(segments)
     
+    def get_segments_at_times(self, transcript_data: list, start_times, end_times) -> list:
+        """
+        Get transcript segments for many time ranges at once
+        
+        Args:
+            transcript_data: List of transcript segments
+            start_times: Sequence of range start times in seconds
+            end_times: Sequence of range end times in seconds
+            
+        Returns:
+            Transcript text per range, as get_segment_at_time would return it
+        """
+        starts, ends, reach = self._time_index(transcript_data)
+        
+        if starts is None:
+            return [self.get_segment_at_time(transcript_data, start, end)
+                    for start, end in zip(start_times, end_times)]
+        
+        # Candidate index range per query, all resolved in one searchsorted pass
+        query_starts = np.asarray(start_times, dtype=np.float64)
+        los = np.searchsorted(np.asarray(reach, dtype=np.float64), query_starts, side='right')
+        his = np.searchsorted(np.asarray(starts, dtype=np.float64),
+                              np.asarray(end_times, dtype=np.float64), side='left')
+        
+        return [
+            ' '.join([transcript_data[i]['text'] for i in range(lo, hi) if ends[i] > start])
+            for lo, hi, start in zip(los.tolist(), his.tolist(), query_starts.tolist())
+        ]
+    
+    @staticmethod
+    def _segment_bounds(transcript_data: list) -> tuple:
+        """(starts, ends) lists for transcript segments"""
+        starts = [segment['start'] for segment in transcript_data]
+        ends = [segment['start'] + segment['duration'] for segment in transcript_data]
+        return starts, ends
+    
+    def _time_index(self, transcript_data: list) -> tuple:
+        """
+        Sorted-time index for `transcript_data`, built once per transcript
+        
+        Returns:
+            (starts, ends, running max of ends), or Nones if starts aren't sorted
+        """
+        cached = self._index_cache
+        if cached and cached[0] is transcript_data and cached[1] == len(transcript_data):
+            return cached[2]
+        
+        starts, ends = self._segment_bounds(transcript_data)
+        if all(a <= b for a, b in zip(starts, starts[1:])):
+            index = starts, ends, list(itertools.accumulate(ends, max))
+        else:
+            index = None, None, None
+        
+        self._index_cache = (transcript_data, len(transcript_data), index)
+        return index
+    
     @staticmethod
     def _seconds_to_timestamp(seconds: float) -> str:
         """Convert seconds to HH:MM:SS format"""
@@ -130,31 +191,58 @@ class TranscriptFetcher:
         millis = int((seconds % 1) * 1000)
         return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
 
-    def to_srt(self, transcript_data: list) -> str:
+    @staticmethod
+    def _timestamp_fields(seconds) -> tuple:
         """
-        Convert transcript data to SRT format
+        Hours, minutes, seconds and millis arrays for many times at once
+        
+        Same arithmetic as _seconds_to_srt_timestamp, vectorized with NumPy.
+        """
+        seconds = np.asarray(seconds, dtype=np.float64)
+        hours = (seconds // 3600).astype(np.int64)
+        minutes = ((seconds % 3600) // 60).astype(np.int64)
+        secs = (seconds % 60).astype(np.int64)
+        millis = ((seconds % 1) * 1000).astype(np.int64)
+        return hours, minutes, secs, millis
+
+    def _srt_timestamps(self, seconds) -> list:
+        """SRT timestamps (HH:MM:SS,mmm) for a sequence of times"""
+        fields = (field.tolist() for field in self._timestamp_fields(seconds))
+        return ["%02d:%02d:%02d,%03d" % row for row in zip(*fields)]
+
+    def iter_srt(self, transcript_data: list):
+        """
+        Generate transcript data in SRT format, one entry at a time
 
         Args:
             transcript_data: List of transcript segments
 
-        Returns:
-            SRT formatted string
+        Yields:
+            SRT entry strings which concatenate to the output of to_srt
         """
-        srt_lines = []
+        starts = np.array([segment['start'] for segment in transcript_data], dtype=np.float64)
+        durations = np.array([segment['duration'] for segment in transcript_data], dtype=np.float64)
+        start_stamps = self._srt_timestamps(starts)
+        end_stamps = self._srt_timestamps(starts + durations)
 
-        for idx, segment in enumerate(transcript_data, start=1):
-            start_time = segment['start']
-            end_time = start_time + segment['duration']
+        separator = ""
+        for idx, (segment, start_ts, end_ts) in enumerate(
+                zip(transcript_data, start_stamps, end_stamps), start=1):
+            # Blank line between entries
+            yield f"{separator}{idx}\n{start_ts} --> {end_ts}\n{segment['text'].strip()}\n"
+            separator = "\n"
 
-            start_ts = self._seconds_to_srt_timestamp(start_time)
-            end_ts = self._seconds_to_srt_timestamp(end_time)
+    def to_srt(self, transcript_data: list) -> str:
+        """
+        Convert transcript data to SRT format
 
-            srt_lines.append(str(idx))
-            srt_lines.append(f"{start_ts} --> {end_ts}")
-            srt_lines.append(segment['text'].strip())
-            srt_lines.append("")  # Blank line between entries
+        Args:
+            transcript_data: List of transcript segments
 
-        return '\n'.join(srt_lines)
+        Returns:
+            SRT formatted string
+        """
+        return ''.join(self.iter_srt(transcript_data))
 
     def save_srt(self, transcript_data: list, output_path: str) -> None:
         """
@@ -164,9 +252,8 @@ class TranscriptFetcher:
             transcript_data: List of transcript segments
             output_path: Path to save the SRT file
         """
-        srt_content = self.to_srt(transcript_data)
         with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(srt_content)
+            f.writelines(self.iter_srt(transcript_data))
         logger.info(f"Saved SRT file to: {output_path}")
 
 
@@ -1,12 +1,130 @@
 import yt_dlp
 from pathlib import Path
+import atexit
+import copy
 import logging
+import os
 import re
-from typing import Optional, Tuple, List, Union
+import shutil
+import subprocess
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from urllib.parse import urljoin
+from typing import Iterator, Optional, Tuple, List, Union
+from utils.video_id import extract_video_id
+from utils.ffmpeg_utils import h264_encoder, h264_encoder_args, hw_upload_filter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+HLS_DOWNLOAD_WORKERS = 8
+# Characters in segment times that can't go into output filenames
+_FS_SAFE_TABLE = str.maketrans({':': '-', '.': '-', '/': '-', '\\': '-'})
+# Multi-connection settings for aria2c, when installed
+ARIA2C_ARGS = ['--min-split-size=1M', '--max-connection-per-server=8', '--split=8',
+               '--file-allocation=none']
+# Concurrent yt-dlp segment downloads in download_multiple_segments
+SEGMENT_DOWNLOAD_WORKERS = 8
+# Concurrent FFmpeg crop encodes in download_multiple_cropped
+CROP_ENCODE_WORKERS = min(4, os.cpu_count() or 1)
+
+
+@lru_cache(maxsize=8)
+def _fetch_playlist(url: str) -> str:
+    """Fetch an HLS playlist once per run (shared by every clip)"""
+    with urllib.request.urlopen(url, timeout=30) as resp:
+        return resp.read().decode('utf-8')
+
+
+# YoutubeDL instances for the fixed option sets below. Building one takes
+# ~50ms (extractor registry, cookie jar, request handlers), and an instance
+# isn't safe to share between threads, so callers check one out of a small
+# per-process pool and return it when done.
+_METADATA_YDL_OPTS = {'quiet': True, 'no_warnings': True}
+_STREAM_YDL_OPTS = {
+    'format': (
+        'bestvideo[ext=mp4][vcodec^=avc1]+bestaudio[ext=m4a]/'
+        'bestvideo[ext=mp4][vcodec^=avc]+bestaudio[ext=m4a]/'
+        'best[ext=mp4]/best'
+    ),
+    'quiet': True,
+    'no_warnings': True,
+    'writesubtitles': False,
+    'writeautomaticsub': False,
+}
+# Idle instances kept per option set; extras are closed on return
+YDL_POOL_SIZE = 4
+_ydl_pool = {}
+_ydl_pool_lock = threading.Lock()
+
+
+@contextmanager
+def _pooled_ydl(opts: dict) -> Iterator[yt_dlp.YoutubeDL]:
+    """Check out a YoutubeDL for one of the module-level option sets"""
+    with _ydl_pool_lock:
+        idle = _ydl_pool.setdefault(id(opts), [])
+        ydl = idle.pop() if idle else None
+    if ydl is None:
+        ydl = yt_dlp.YoutubeDL(opts)
+    try:
+        yield ydl
+    finally:
+        with _ydl_pool_lock:
+            idle = _ydl_pool[id(opts)]
+            if len(idle) < YDL_POOL_SIZE:
+                idle.append(ydl)
+                ydl = None
+        if ydl is not None:
+            ydl.close()
+
+
+@atexit.register
+def _close_ydl_pool() -> None:
+    with _ydl_pool_lock:
+        for idle in _ydl_pool.values():
+            for ydl in idle:
+                ydl.close()
+        _ydl_pool.clear()
+
+
+# Raw extractor results per URL, shared by every download/stream lookup in a
+# run. YouTube's signed stream URLs expire after about 6 hours, so entries are
+# refreshed well before that.
+INFO_CACHE_TTL = 4 * 3600
+_info_cache = {}
+_info_lock = threading.Lock()
+
+
+def _extract_raw_info(url: str) -> dict:
+    """
+    Extractor result for `url` (metadata + formats, no format selection),
+    fetched from YouTube once per INFO_CACHE_TTL
+
+    Returns a copy that YoutubeDL.process_ie_result can resolve and mutate.
+    """
+    with _info_lock:
+        cached = _info_cache.get(url)
+    if cached is None or time.monotonic() - cached[0] > INFO_CACHE_TTL:
+        with _pooled_ydl(_METADATA_YDL_OPTS) as ydl:
+            info = ydl.extract_info(url, download=False, process=False)
+        cached = (time.monotonic(), info)
+        with _info_lock:
+            _info_cache[url] = cached
+
+    # Format selection sorts and annotates nested lists/dicts (formats,
+    # thumbnails, subtitles, ...) in place, so each caller gets its own tree
+    return copy.deepcopy(cached[1])
+
+
+def _fetch_to_file(url: str, path: Path) -> None:
+    with urllib.request.urlopen(url, timeout=60) as resp, open(path, 'wb') as f:
+        while chunk := resp.read(1 << 16):
+            f.write(chunk)
+
 
 class VideoDownloader:
     """Download YouTube videos using yt-dlp with partial/segment support"""
@@ -14,6 +132,17 @@ class VideoDownloader:
     def __init__(self, output_dir: Path):
         self.output_dir = output_dir
         self.output_dir.mkdir(exist_ok=True)
+        
+        # aria2c splits HTTP downloads over several connections, which YouTube
+        # throttles far less than a single stream (time-range sections still
+        # go through FFmpeg)
+        self._downloader_opts = {}
+        if shutil.which('aria2c'):
+            self._downloader_opts = {
+                'external_downloader': {'default': 'aria2c'},
+                'external_downloader_args': {'aria2c': ARIA2C_ARGS},
+            }
+            logger.info("Using aria2c for downloads")
     
     def download(self, youtube_url: str, video_id: str = None) -> dict:
         """
@@ -54,12 +183,13 @@ class VideoDownloader:
             'postprocessor_args': {
                 'merger': ['-sn'],
             },
+            **self._downloader_opts,
         }
         
         try:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 logger.info(f"Downloading full video: {youtube_url}")
-                info = ydl.extract_info(youtube_url, download=True)
+                info = ydl.process_ie_result(_extract_raw_info(youtube_url), download=True)
                 
                 filename = ydl.prepare_filename(info)
                 
@@ -71,6 +201,7 @@ class VideoDownloader:
                     'uploader': info.get('uploader', ''),
                     'upload_date': info.get('upload_date', ''),
                     'vcodec': info.get('vcodec', ''),
+                    'acodec': info.get('acodec', ''),
                 }
                 
         except Exception as e:
@@ -94,18 +225,46 @@ class VideoDownloader:
             dict with 'path', 'title', 'duration', 'thumbnail', 'segment_start', 'segment_end'
         """
         
+        return self._download_segment_fast(
+            youtube_url, start_time, end_time,
+            *self._normalize_segment(start_time, end_time),
+            video_id=video_id, force_keyframes=force_keyframes
+        )
+    
+    def _normalize_segment(self, start_time: Union[str, float, int],
+                           end_time: Union[str, float, int]) -> Tuple[str, str, int]:
+        """Parse a segment's times once: (yt-dlp start, yt-dlp end, duration in seconds)"""
+        return (
+            self._format_time(start_time),
+            self._format_time(end_time),
+            self._time_to_seconds(end_time) - self._time_to_seconds(start_time)
+        )
+    
+    def _download_segment_fast(self, youtube_url: str, start_time: Union[str, float, int],
+                               end_time: Union[str, float, int], start_str: str, end_str: str,
+                               segment_duration: int, video_id: str = None,
+                               force_keyframes: bool = False) -> dict:
+        """download_segment with times already normalized by _normalize_segment"""
         if not video_id:
             video_id = self._extract_video_id(youtube_url)
         
-        # Convert times to yt-dlp format
-        start_str = self._format_time(start_time)
-        end_str = self._format_time(end_time)
-        
         # Create segment-specific filename
-        safe_start = re.sub(r'[:.]', '-', str(start_time))
-        safe_end = re.sub(r'[:.]', '-', str(end_time))
+        safe_start = str(start_time).translate(_FS_SAFE_TABLE)
+        safe_end = str(end_time).translate(_FS_SAFE_TABLE)
         output_template = str(self.output_dir / f"{video_id}_segment_{safe_start}_{safe_end}.%(ext)s")
         
+        # Keyframe-aligned cuts are a plain stream copy, which FFmpeg can do
+        # straight from the stream URLs. yt-dlp is only needed to re-encode
+        # at the cut points, or if the direct cut fails.
+        if not force_keyframes:
+            try:
+                return self._download_segment_direct(
+                    youtube_url, start_time, end_time, start_str, end_str,
+                    segment_duration, output_template % {'ext': 'mp4'}
+                )
+            except subprocess.CalledProcessError as e:
+                logger.warning(f"Direct segment cut failed, falling back to yt-dlp: {e.stderr}")
+        
         # Build download sections string
         # Format: "*start-end" (asterisk indicates time range, not chapter)
         download_sections = f"*{start_str}-{end_str}"
@@ -128,18 +287,16 @@ class VideoDownloader:
             'postprocessor_args': {
                 'merger': ['-sn'],
             },
+            **self._downloader_opts,
         }
         
         try:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 logger.info(f"Downloading segment {start_str}-{end_str} from: {youtube_url}")
-                info = ydl.extract_info(youtube_url, download=True)
+                info = ydl.process_ie_result(_extract_raw_info(youtube_url), download=True)
                 
                 filename = ydl.prepare_filename(info)
                 
-                # Calculate actual segment duration
-                segment_duration = self._time_to_seconds(end_time) - self._time_to_seconds(start_time)
-                
                 return {
                     'path': filename,
                     'title': info.get('title', ''),
@@ -148,6 +305,7 @@ class VideoDownloader:
                     'uploader': info.get('uploader', ''),
                     'upload_date': info.get('upload_date', ''),
                     'vcodec': info.get('vcodec', ''),
+                    'acodec': info.get('acodec', ''),
                     'segment_start': start_str,
                     'segment_end': end_str,
                     'full_duration': info.get('duration', 0),
@@ -157,6 +315,53 @@ class VideoDownloader:
             logger.error(f"Error downloading segment: {str(e)}")
             raise
     
+    def _download_segment_direct(self, youtube_url: str, start_time: Union[str, float, int],
+                                 end_time: Union[str, float, int], start_str: str, end_str: str,
+                                 segment_duration: int, output_path: str) -> dict:
+        """
+        Stream-copy a segment from the stream URLs in a single FFmpeg call
+        
+        Same cut as yt-dlp's download_sections without force_keyframes_at_cuts
+        (input seeking + stream copy), minus yt-dlp's own downloader and
+        merge passes.
+        """
+        stream_info = self.get_stream_url(youtube_url)
+        
+        start_sec = float(start_time) if isinstance(start_time, (int, float)) else self._time_to_seconds(start_time)
+        end_sec = float(end_time) if isinstance(end_time, (int, float)) else self._time_to_seconds(end_time)
+        duration = end_sec - start_sec
+        
+        cmd = ['ffmpeg', '-y', '-v', 'error', '-ss', str(start_sec), '-t', str(duration),
+               '-i', stream_info['video_url']]
+        if stream_info['audio_url'] != stream_info['video_url']:
+            cmd += ['-ss', str(start_sec), '-t', str(duration), '-i', stream_info['audio_url'],
+                    '-map', '0:v:0', '-map', '1:a:0']
+        else:
+            cmd += ['-map', '0:v:0', '-map', '0:a:0?']
+        cmd += ['-c', 'copy', '-movflags', '+faststart', output_path]
+        
+        logger.info(f"Downloading segment {start_str}-{end_str} from: {youtube_url}")
+        try:
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        except subprocess.CalledProcessError:
+            # Don't leave a partial file for yt-dlp to mistake for a finished download
+            Path(output_path).unlink(missing_ok=True)
+            raise
+        
+        return {
+            'path': output_path,
+            'title': stream_info['title'],
+            'duration': segment_duration,
+            'thumbnail': stream_info['thumbnail'],
+            'uploader': stream_info['uploader'],
+            'upload_date': stream_info['upload_date'],
+            'vcodec': stream_info['vcodec'],
+            'acodec': stream_info['acodec'],
+            'segment_start': start_str,
+            'segment_end': end_str,
+            'full_duration': stream_info['duration'],
+        }
+    
     def download_multiple_segments(self, youtube_url: str, 
                                    segments: List[Tuple[Union[str, float, int], Union[str, float, int]]],
                                    video_id: str = None,
@@ -174,16 +379,22 @@ class VideoDownloader:
             List of dicts for each segment, or single dict if merge=True
         """
         
-        results = []
-        
-        for i, (start, end) in enumerate(segments):
-            result = self.download_segment(
+        # Each download_segment call uses its own YoutubeDL and is network-bound,
+        # so segments download concurrently (results keep the input order)
+        def download(job):
+            i, (start, end) = job
+            return self._download_segment_fast(
                 youtube_url, 
                 start, 
                 end, 
+                *normalized[i],
                 video_id=f"{video_id or 'video'}_part{i+1}" if not merge else video_id
             )
-            results.append(result)
+        
+        normalized = [self._normalize_segment(start, end) for start, end in segments]
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(SEGMENT_DOWNLOAD_WORKERS, len(segments)))) as executor:
+            results = list(executor.map(download, enumerate(segments)))
         
         if merge and len(results) > 1:
             # Merge segments using FFmpeg
@@ -219,28 +430,34 @@ class VideoDownloader:
         # First download the segment
         segment_info = self.download_segment(youtube_url, start_time, end_time, video_id)
         
-        # Calculate crop parameters for 9:16 aspect ratio
-        crop_width = int(video_height * 9 / 16)
+        # Calculate crop parameters for 9:16 aspect ratio (even values for 4:2:0 chroma)
+        crop_width = (video_height * 9 // 16) & ~1
         x_start = int(crop_x - crop_width / 2)
-        x_start = max(0, min(x_start, video_width - crop_width))
+        x_start = max(0, min(x_start, video_width - crop_width)) & ~1
         
         # Apply crop using FFmpeg
         input_path = segment_info['path']
         output_path = str(Path(input_path).with_suffix('')) + "_cropped.mp4"
         
-        import subprocess
+        # The crop only touches video: AAC audio is copied as-is, and video
+        # goes to a hardware encoder when one is available
+        if (segment_info.get('acodec') or '').startswith('mp4a'):
+            audio_args = ['-c:a', 'copy']
+        else:
+            audio_args = ['-c:a', 'aac', '-b:a', '128k']
         
+        encoder = h264_encoder()
         cmd = [
-            'ffmpeg', '-y', '-i', input_path,
-            '-vf', f"crop={crop_width}:{video_height}:{x_start}:0,scale=1080:1920",
-            '-c:v', 'libx264', '-preset', 'fast', '-crf', '23',
-            '-c:a', 'aac', '-b:a', '128k',
+            'ffmpeg', '-y', '-v', 'error', '-i', input_path,
+            '-vf', f"crop={crop_width}:{video_height}:{x_start}:0,scale=1080:1920{hw_upload_filter(encoder)}",
+            *h264_encoder_args(encoder),
+            *audio_args,
             '-movflags', '+faststart',
             output_path
         ]
         
         try:
-            subprocess.run(cmd, check=True, capture_output=True, text=True)
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
             logger.info(f"Cropped video saved to: {output_path}")
             
             # Clean up original segment if desired
@@ -258,6 +475,112 @@ class VideoDownloader:
             logger.error(f"FFmpeg crop failed: {e.stderr}")
             raise
     
+    def download_segment_cropped(self, youtube_url: str, start_time: Union[str, float, int],
+                                 end_time: Union[str, float, int], crop_x: int,
+                                 video_height: int = 1080, video_width: int = 1920,
+                                 video_id: str = None) -> dict:
+        """
+        Cut AND crop a segment straight from the stream URLs in one FFmpeg pass
+        
+        Same result as download_with_crop, without writing and re-reading an
+        intermediate segment file.
+        
+        Args:
+            youtube_url: YouTube video URL
+            start_time: Start time
+            end_time: End time
+            crop_x: X position for crop (center of crop window)
+            video_height: Original video height
+            video_width: Original video width
+            video_id: Optional custom video ID
+            
+        Returns:
+            dict with 'path' to cropped video
+        """
+        if not video_id:
+            video_id = self._extract_video_id(youtube_url)
+        
+        stream_info = self.get_stream_url(youtube_url)
+        
+        start_sec = float(start_time) if isinstance(start_time, (int, float)) else self._time_to_seconds(start_time)
+        end_sec = float(end_time) if isinstance(end_time, (int, float)) else self._time_to_seconds(end_time)
+        duration = end_sec - start_sec
+        
+        # Calculate crop parameters for 9:16 aspect ratio (even values for 4:2:0 chroma)
+        crop_width = (video_height * 9 // 16) & ~1
+        x_start = int(crop_x - crop_width / 2)
+        x_start = max(0, min(x_start, video_width - crop_width)) & ~1
+        
+        safe_start = str(start_time).translate(_FS_SAFE_TABLE)
+        safe_end = str(end_time).translate(_FS_SAFE_TABLE)
+        output_path = str(self.output_dir / f"{video_id}_segment_{safe_start}_{safe_end}_cropped.mp4")
+        
+        encoder = h264_encoder()
+        
+        # Input-side -ss/-t on each stream: only the needed byte ranges are fetched
+        cmd = ['ffmpeg', '-y', '-v', 'error', '-ss', str(start_sec), '-t', str(duration),
+               '-i', stream_info['video_url']]
+        if stream_info['audio_url'] != stream_info['video_url']:
+            cmd += ['-ss', str(start_sec), '-t', str(duration), '-i', stream_info['audio_url'],
+                    '-map', '0:v:0', '-map', '1:a:0']
+        else:
+            cmd += ['-map', '0:v:0', '-map', '0:a:0?']
+        cmd += [
+            '-vf', f"crop={crop_width}:{video_height}:{x_start}:0,scale=1080:1920{hw_upload_filter(encoder)}",
+            *h264_encoder_args(encoder),
+            '-c:a', 'aac', '-b:a', '128k',
+            '-movflags', '+faststart',
+            output_path
+        ]
+        
+        try:
+            logger.info(f"Cutting and cropping {start_sec:.1f}s-{end_sec:.1f}s from: {youtube_url}")
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            logger.info(f"Cropped video saved to: {output_path}")
+            
+            return {
+                'path': output_path,
+                'title': stream_info['title'],
+                'duration': duration,
+                'segment_start': self._format_time(start_time),
+                'segment_end': self._format_time(end_time),
+                'full_duration': stream_info['duration'],
+                'cropped': True,
+                'crop_x': crop_x,
+                'aspect_ratio': '9:16'
+            }
+            
+        except subprocess.CalledProcessError as e:
+            logger.error(f"FFmpeg crop failed: {e.stderr}")
+            raise
+    
+    def download_multiple_cropped(self, youtube_url: str,
+                                  segments: List[Tuple[Union[str, float, int], Union[str, float, int], int]],
+                                  video_height: int = 1080, video_width: int = 1920,
+                                  video_id: str = None) -> List[dict]:
+        """
+        Cut and crop several segments concurrently (see download_segment_cropped)
+        
+        Args:
+            youtube_url: YouTube video URL
+            segments: List of (start_time, end_time, crop_x) tuples
+            video_height: Original video height
+            video_width: Original video width
+            video_id: Optional custom video ID
+            
+        Returns:
+            List of dicts for each segment, in input order
+        """
+        def crop(job):
+            start, end, crop_x = job
+            return self.download_segment_cropped(youtube_url, start, end, crop_x,
+                                                 video_height, video_width, video_id)
+        
+        # Each job is a CPU-heavy FFmpeg encode, so bound them by core count
+        workers = max(1, min(len(segments), CROP_ENCODE_WORKERS))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(crop, segments))
+    
     def get_stream_url(self, youtube_url: str) -> dict:
         """
         Extract direct stream URL without downloading.
@@ -265,36 +588,99 @@ class VideoDownloader:
         Returns:
             dict with 'video_url', 'audio_url', 'title', 'duration'
         """
-        ydl_opts = {
-            'format': (
-                'bestvideo[ext=mp4][vcodec^=avc1]+bestaudio[ext=m4a]/'
-                'bestvideo[ext=mp4][vcodec^=avc]+bestaudio[ext=m4a]/'
-                'best[ext=mp4]/best'
-            ),
-            'quiet': True,
-            'no_warnings': True,
-            'writesubtitles': False,
-            'writeautomaticsub': False,
+        raw_info = _extract_raw_info(youtube_url)
+        with _pooled_ydl(_STREAM_YDL_OPTS) as ydl:
+            info = ydl.process_ie_result(raw_info, download=False)
+
+        # Get the selected format URLs
+        requested_formats = info.get('requested_formats', [])
+        if requested_formats:
+            video_url = requested_formats[0]['url']
+            audio_url = requested_formats[1]['url'] if len(requested_formats) > 1 else video_url
+            protocol = requested_formats[0].get('protocol', '')
+        else:
+            video_url = info['url']
+            audio_url = info['url']
+            protocol = info.get('protocol', '')
+
+        return {
+            'video_url': video_url,
+            'audio_url': audio_url,
+            'is_hls': protocol.startswith('m3u8'),
+            'title': info.get('title', ''),
+            'duration': info.get('duration', 0),
+            'width': info.get('width'),
+            'height': info.get('height'),
+            'thumbnail': info.get('thumbnail', ''),
+            'uploader': info.get('uploader', ''),
+            'upload_date': info.get('upload_date', ''),
+            'vcodec': info.get('vcodec', ''),
+            'acodec': info.get('acodec', ''),
         }
 
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(youtube_url, download=False)
+    def download_hls_window(self, playlist_url: str, start_time: float, end_time: float,
+                            work_dir: Path) -> Optional[dict]:
+        """
+        Download only the HLS media segments overlapping [start_time, end_time]
 
-            # Get the selected format URLs
-            requested_formats = info.get('requested_formats', [])
-            if requested_formats:
-                video_url = requested_formats[0]['url']
-                audio_url = requested_formats[1]['url'] if len(requested_formats) > 1 else video_url
-            else:
-                video_url = info['url']
-                audio_url = info['url']
+        Segments are fetched concurrently and listed in a local playlist, so
+        FFmpeg and OpenCV read local files instead of seeking the remote stream.
 
-            return {
-                'video_url': video_url,
-                'audio_url': audio_url,
-                'title': info.get('title', ''),
-                'duration': info.get('duration', 0),
-            }
+        Args:
+            playlist_url: HLS media playlist URL (from get_stream_url)
+            start_time: Clip start in seconds
+            end_time: Clip end in seconds
+            work_dir: Directory for the segments and trimmed playlist
+
+        Returns:
+            dict with 'path' (local .m3u8) and 'offset' (clip start relative to
+            the first kept segment), or None if the playlist can't be trimmed
+        """
+        lines = _fetch_playlist(playlist_url).splitlines()
+        if any(line.startswith(('#EXT-X-KEY', '#EXT-X-STREAM-INF')) for line in lines):
+            # Encrypted media or a master playlist: leave it to FFmpeg
+            return None
+
+        header, segments, init_uri = [], [], None
+        position, duration = 0.0, None
+        for line in lines:
+            line = line.strip()
+            if line.startswith('#EXTINF:'):
+                duration = float(line[8:].split(',', 1)[0])
+            elif line.startswith('#EXT-X-MAP:'):
+                match = re.search(r'URI="([^"]+)"', line)
+                init_uri = match.group(1) if match else None
+            elif line.startswith(('#EXTM3U', '#EXT-X-VERSION', '#EXT-X-TARGETDURATION')):
+                header.append(line)
+            elif line and not line.startswith('#') and duration is not None:
+                segments.append((position, duration, urljoin(playlist_url, line)))
+                position += duration
+                duration = None
+
+        kept = [seg for seg in segments if seg[0] < end_time and seg[0] + seg[1] > start_time]
+        if not kept:
+            return None
+
+        work_dir.mkdir(parents=True, exist_ok=True)
+        jobs = [(url, work_dir / f"seg_{n:05d}.ts") for n, (_, _, url) in enumerate(kept)]
+        if init_uri:
+            jobs.append((urljoin(playlist_url, init_uri), work_dir / "init.mp4"))
+
+        with ThreadPoolExecutor(max_workers=HLS_DOWNLOAD_WORKERS) as executor:
+            list(executor.map(lambda job: _fetch_to_file(*job), jobs))
+
+        playlist = header + ['#EXT-X-MEDIA-SEQUENCE:0', '#EXT-X-PLAYLIST-TYPE:VOD']
+        if init_uri:
+            playlist.append('#EXT-X-MAP:URI="init.mp4"')
+        for (_, seg_duration, _), (_, seg_path) in zip(kept, jobs):
+            playlist += [f"#EXTINF:{seg_duration:.3f},", seg_path.name]
+        playlist.append('#EXT-X-ENDLIST')
+
+        manifest = work_dir / "clip.m3u8"
+        manifest.write_text('\n'.join(playlist) + '\n', encoding='utf-8')
+        logger.info(f"Fetched {len(kept)}/{len(segments)} HLS segments for {start_time:.1f}s-{end_time:.1f}s")
+
+        return {'path': str(manifest), 'offset': start_time - kept[0][0]}
 
     def _format_time(self, time_val: Union[str, float, int]) -> str:
         """Convert various time formats to yt-dlp string format"""
@@ -303,15 +689,9 @@ class VideoDownloader:
             return time_val
         
         # Convert seconds to HH:MM:SS or MM:SS
-        seconds = int(time_val)
-        hours = seconds // 3600
-        minutes = (seconds % 3600) // 60
-        secs = seconds % 60
-        
-        if hours > 0:
-            return f"{hours}:{minutes:02d}:{secs:02d}"
-        else:
-            return f"{minutes}:{secs:02d}"
+        minutes, secs = divmod(int(time_val), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
     
     def _time_to_seconds(self, time_val: Union[str, float, int]) -> int:
         """Convert time to seconds for duration calculation"""
@@ -327,44 +707,50 @@ class VideoDownloader:
         else:
             return int(parts[0])
     
-    def _merge_segments(self, segment_results: List[dict], video_id: str) -> str:
-        """Merge multiple video segments using FFmpeg concat"""
-        import subprocess
+    def merge_many(self, groups: dict) -> dict:
+        """
+        Merge several groups of segments concurrently
+        
+        Args:
+            groups: Mapping of video_id -> segment result dicts to concatenate
+            
+        Returns:
+            Mapping of video_id -> merged file path
+        """
+        if not groups:
+            return {}
         
-        # Create concat list file
-        list_file = self.output_dir / f"{video_id}_concat_list.txt"
-        with open(list_file, 'w') as f:
-            for seg in segment_results:
-                f.write(f"file '{seg['path']}'\n")
+        # Stream-copy merges are I/O-bound, so they overlap well
+        with ThreadPoolExecutor(max_workers=min(len(groups), SEGMENT_DOWNLOAD_WORKERS)) as executor:
+            paths = executor.map(lambda item: self._merge_segments(item[1], item[0]), groups.items())
+            return dict(zip(groups, paths))
+    
+    def _merge_segments(self, segment_results: List[dict], video_id: str) -> str:
+        """Merge multiple video segments using FFmpeg concat (list passed over stdin)"""
+        # Absolute file: URLs (bare paths would resolve against pipe:),
+        # quoted for the concat demuxer
+        concat_list = ''.join(
+            "file 'file:{}'\n".format(Path(seg['path']).resolve().as_posix().replace("'", "'\\''"))
+            for seg in segment_results
+        )
         
         output_path = str(self.output_dir / f"{video_id}_merged.mp4")
         
         cmd = [
-            'ffmpeg', '-y', '-f', 'concat', '-safe', '0',
-            '-i', str(list_file),
+            'ffmpeg', '-y', '-fflags', '+genpts',
+            '-f', 'concat', '-safe', '0', '-protocol_whitelist', 'file,pipe',
+            '-i', 'pipe:0',
             '-c', 'copy',
             output_path
         ]
         
-        subprocess.run(cmd, check=True)
-        list_file.unlink()  # Clean up list file
+        subprocess.run(cmd, input=concat_list, text=True, check=True)
         
         return output_path
     
     def _extract_video_id(self, url: str) -> str:
         """Extract video ID from YouTube URL"""
-        patterns = [
-            r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',
-            r'(?:embed\/)([0-9A-Za-z_-]{11})',
-            r'^([0-9A-Za-z_-]{11})$'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-        
-        raise ValueError(f"Could not extract video ID from URL: {url}")
+        return extract_video_id(url)
 
 
 # Example usage
@@ -0,0 +1,20 @@
+import re
+from functools import lru_cache
+
+# Tried in order; the first match wins
+_VIDEO_ID_PATTERNS = [
+    re.compile(r'(?:v=|\/)([0-9A-Za-z_-]{11}).*'),
+    re.compile(r'(?:embed\/)([0-9A-Za-z_-]{11})'),
+    re.compile(r'^([0-9A-Za-z_-]{11})$'),
+]
+
+
+@lru_cache(maxsize=1024)
+def extract_video_id(url: str) -> str:
+    """Extract video ID from YouTube URL (memoized: each URL is parsed at several call sites)"""
+    for pattern in _VIDEO_ID_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return match.group(1)
+
+    raise ValueError(f"Could not extract video ID from URL: {url}")
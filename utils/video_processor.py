@@ -1,13 +1,21 @@
+import asyncio
+import os
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import logging
 from config import (
     OUTPUT_RESOLUTIONS,
-    FFMPEG_PRESET,
-    FFMPEG_CRF,
+    CLIP_WORKERS,
+    FFMPEG_THREADS,
+    FFMPEG_TUNE,
+    SHORT_CLIP_SECONDS,
     AUDIO_BITRATE
 )
 from utils.crop_detector import CropDetector
+from utils.ffmpeg_utils import h264_encoder, h264_encoder_args, hw_upload_filter, escape_filter_value
+from utils.json_utils import json_loads
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,6 +26,7 @@ class VideoProcessor:
     
     def __init__(self):
         self.crop_detector = CropDetector(face_detection_enabled=True, use_mediapipe=True)
+        self._info_cache = {}
     
     def create_clip(
         self,
@@ -28,7 +37,11 @@ class VideoProcessor:
         aspect_ratio: str = 'vertical',
         crop_method: str = 'auto',
         subtitle_file: str = None,
-        audio_url: str = None
+        audio_url: str = None,
+        threads: int = 0,
+        crop: tuple = None,
+        video_info: dict = None,
+        progress_callback=None
     ) -> dict:
         """
         Create a video clip with specified parameters
@@ -42,36 +55,145 @@ class VideoProcessor:
             crop_method: 'auto', 'center', 'cropdetect', or 'face'
             subtitle_file: Optional path to .ass subtitle file
             audio_url: Separate audio stream URL (for stream-based downloads)
+            threads: FFmpeg thread count (0 lets FFmpeg decide)
+            crop: Precomputed (crop_x, method) from CropDetector.detect_crop_position
+            video_info: Known 'width'/'height' of the input (skips the ffprobe call)
+            progress_callback: Optional callable receiving seconds of output encoded so far
 
         Returns:
             dict with processing info
         """
 
+        cmd, result = self._build_clip_command(
+            input_path, output_path, start_time, end_time,
+            aspect_ratio=aspect_ratio, crop_method=crop_method, subtitle_file=subtitle_file,
+            audio_url=audio_url, threads=threads, crop=crop, video_info=video_info
+        )
+
+        try:
+            self._run_ffmpeg(cmd, progress_callback)
+            logger.info(f"Successfully created clip: {output_path}")
+            return result
+
+        except subprocess.CalledProcessError as e:
+            logger.error(f"FFmpeg error: {e.stderr}")
+            raise
+    
+    async def create_clip_async(self, input_path: str, output_path: str, start_time: float,
+                                end_time: float, progress_callback=None, **kwargs) -> dict:
+        """
+        create_clip for asyncio callers (same arguments and result)
+
+        FFmpeg runs as an asyncio subprocess, so clips being encoded
+        concurrently don't each hold a thread.
+        """
+        # Probing and crop detection are short next to the encode; they run on
+        # a worker thread to keep the event loop free
+        cmd, result = await asyncio.to_thread(
+            self._build_clip_command, input_path, output_path, start_time, end_time, **kwargs
+        )
+
+        try:
+            await self._run_ffmpeg_async(cmd, progress_callback)
+            logger.info(f"Successfully created clip: {output_path}")
+            return result
+
+        except subprocess.CalledProcessError as e:
+            logger.error(f"FFmpeg error: {e.stderr}")
+            raise
+    
+    def create_clips(self, jobs: list, workers: int = None) -> list:
+        """
+        Create several clips concurrently (see create_clip)
+
+        Args:
+            jobs: List of create_clip keyword-argument dicts
+            workers: Concurrent FFmpeg processes (default: CLIP_WORKERS)
+
+        Returns:
+            List of create_clip results, in input order
+        """
+        if not jobs:
+            return []
+
+        # One FFmpeg can't keep every core busy at fast presets, so run a few
+        # and split the cores between them
+        workers = max(1, min(len(jobs), workers or CLIP_WORKERS))
+        threads = FFMPEG_THREADS or max(1, (os.cpu_count() or 1) // workers)
+        logger.info(f"Creating {len(jobs)} clip(s) with {workers} worker(s), {threads} FFmpeg thread(s) each")
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda job: self.create_clip(**{'threads': threads, **job}), jobs))
+    
+    def _copy_clip_command(self, input_path: str, output_path: str, start_time: float,
+                           duration: float, audio_url: str = None) -> tuple:
+        """Command cutting a clip without re-encoding (starts at the keyframe before start_time)"""
+        cmd = ['ffmpeg', '-ss', str(start_time), '-i', input_path]
+        if audio_url:
+            cmd += ['-ss', str(start_time), '-i', audio_url]
+
+        cmd += ['-t', str(duration), '-c', 'copy', '-avoid_negative_ts', 'make_zero']
+
+        cmd += self._map_args(audio_url)
+        cmd += ['-movflags', '+faststart', '-y', output_path]
+
+        logger.info(f"Copying clip (no crop needed): {Path(output_path).name}")
+
+        return cmd, {
+            'success': True,
+            'output_path': output_path,
+            'duration': duration,
+            'crop_method': 'copy',
+            'crop_position': 0,
+        }
+    
+    def _build_clip_command(
+        self,
+        input_path: str,
+        output_path: str,
+        start_time: float,
+        end_time: float,
+        aspect_ratio: str = 'vertical',
+        crop_method: str = 'auto',
+        subtitle_file: str = None,
+        audio_url: str = None,
+        threads: int = 0,
+        crop: tuple = None,
+        video_info: dict = None
+    ) -> tuple:
+        """Probe, detect the crop and build the FFmpeg command for create_clip: (cmd, result)"""
         duration = end_time - start_time
 
         # Get video info
-        video_info = self._get_video_info(input_path)
+        if not video_info:
+            video_info = self._get_video_info(input_path)
         original_width = video_info['width']
         original_height = video_info['height']
 
         # Determine target resolution
         target_width, target_height = OUTPUT_RESOLUTIONS[aspect_ratio]
 
+        if self.can_stream_copy(video_info, aspect_ratio, subtitle_file):
+            cmd, result = self._copy_clip_command(input_path, output_path, start_time, duration, audio_url)
+            return cmd, {**result, 'resolution': f"{target_width}x{target_height}"}
+
         # Detect optimal crop position
-        logger.info(f"Detecting crop position using method: {crop_method}")
-        crop_x, method_used = self.crop_detector.detect_crop_position(
-            input_path,
-            start_time,
-            duration,
-            method=crop_method
-        )
+        if crop is None:
+            logger.info(f"Detecting crop position using method: {crop_method}")
+            crop = self.crop_detector.detect_crop_position(
+                input_path,
+                start_time,
+                duration,
+                method=crop_method
+            )
+        crop_x, method_used = crop
 
-        # Calculate crop dimensions
-        crop_width = int(original_height * target_width / target_height)
-        crop_height = original_height
+        # Calculate crop dimensions (even, as YUV 4:2:0 chroma is subsampled 2x2)
+        crop_width = (original_height * target_width // target_height) & ~1
+        crop_height = original_height & ~1
 
         # Ensure crop fits within video bounds
-        crop_x = max(0, min(crop_x - crop_width // 2, original_width - crop_width))
+        crop_x = max(0, min(crop_x - crop_width // 2, original_width - crop_width)) & ~1
 
         logger.info(f"Cropping: {crop_width}x{crop_height} at position {crop_x},0")
 
@@ -87,12 +209,20 @@ class VideoProcessor:
         # Add subtitles if provided (use 'ass' filter instead of 'subtitles'
         # to avoid rendering embedded subtitle streams from the input)
         if subtitle_file:
-            # Escape path for FFmpeg
-            subtitle_path = Path(subtitle_file).absolute()
-            subtitle_path_str = str(subtitle_path).replace('\\', '/').replace(':', '\\:')
-            vf_filters.append(f"ass='{subtitle_path_str}'")
+            # Escape path for FFmpeg (quotes, brackets and commas included)
+            subtitle_path = Path(subtitle_file).absolute().as_posix()
+            vf_filters.append(f"ass=filename={escape_filter_value(subtitle_path)}")
+
+        # Hardware encoder when one works here (see utils.ffmpeg_utils)
+        encoder = h264_encoder()
+        vf_string = ','.join(vf_filters) + hw_upload_filter(encoder)
 
-        vf_string = ','.join(vf_filters)
+        # Opt-in preview mode: x264's frame threads and lookahead take a while
+        # to fill, so a short clip is done sooner with zerolatency's sliced
+        # threads (hardware encoders ignore the tune)
+        tune = FFMPEG_TUNE
+        if not tune and duration < SHORT_CLIP_SECONDS:
+            tune = 'zerolatency'
 
         # Build FFmpeg command
         cmd = ['ffmpeg', '-ss', str(start_time)]
@@ -107,56 +237,136 @@ class VideoProcessor:
         cmd += [
             '-t', str(duration),
             '-vf', vf_string,
-            '-c:v', 'libx264',
-            '-preset', FFMPEG_PRESET,
-            '-crf', str(FFMPEG_CRF),
+            *h264_encoder_args(encoder, tune=tune),
             '-c:a', 'aac',
             '-b:a', AUDIO_BITRATE,
         ]
 
-        # Explicitly map only video and audio streams (strip all subtitle streams)
-        if audio_url:
-            cmd += ['-map', '0:v:0', '-map', '1:a:0']
-        else:
-            cmd += ['-map', '0:v:0', '-map', '0:a:0']
+        # The crop filter only offsets frame pointers, so scale is the one pass
+        # over the pixels; cap its slice threads along with the encoder's so
+        # concurrent clips don't each spread across every core
+        if threads:
+            cmd += ['-threads', str(threads), '-filter_threads', str(threads)]
+
+        cmd += self._map_args(audio_url)
 
-        cmd += ['-sn', '-dn', '-y', output_path]
+        # Put the moov atom up front so clips start playing before fully downloaded
+        cmd += ['-movflags', '+faststart', '-y', output_path]
 
         logger.info(f"Processing clip: {Path(output_path).name}")
-        logger.info(f"Command: {' '.join(cmd)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Command: {' '.join(cmd)}")
 
-        try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True
-            )
+        return cmd, {
+            'success': True,
+            'output_path': output_path,
+            'duration': duration,
+            'crop_method': method_used,
+            'crop_position': crop_x,
+            'resolution': f"{target_width}x{target_height}"
+        }
+    
+    @staticmethod
+    def can_stream_copy(video_info: dict, aspect_ratio: str, subtitle_file: str = None) -> bool:
+        """Whether create_clip copies the streams (so needs no crop position)"""
+        # Source already at the target size and nothing to burn in: the
+        # crop/scale would be a no-op, so the streams are copied instead
+        return ((video_info['width'], video_info['height']) == OUTPUT_RESOLUTIONS[aspect_ratio]
+                and not subtitle_file)
+    
+    @staticmethod
+    def _map_args(audio_url: str = None) -> list:
+        """Output stream mapping: first video stream plus audio if there is any"""
+        # Explicit maps leave out subtitle and data streams; '?' lets silent
+        # sources through instead of failing the clip. Source metadata and
+        # chapters don't apply to a clip, so they aren't carried over.
+        args = ['-map_metadata', '-1', '-map_chapters', '-1', '-max_muxing_queue_size', '1024']
+        if audio_url:
+            return ['-map', '0:v:0', '-map', '1:a:0?', '-shortest', *args]
+        return ['-map', '0:v:0', '-map', '0:a:0?', *args]
+    
+    @staticmethod
+    def _progress_command(cmd: list) -> list:
+        """`cmd` with machine-readable progress on stdout instead of stats on stderr"""
+        # With the info log off too, stderr only carries warnings and errors
+        return [cmd[0], '-hide_banner', '-nostats', '-loglevel', 'warning',
+                '-progress', 'pipe:1', *cmd[1:]]
+    
+    @staticmethod
+    def _report_progress(line: str, progress_callback) -> None:
+        """Pass an out_time_us progress line on to progress_callback, in seconds"""
+        if progress_callback and line.startswith('out_time_us='):
+            value = line[len('out_time_us='):].strip()
+            if value.isdigit():
+                progress_callback(int(value) / 1_000_000)
+    
+    def _run_ffmpeg(self, cmd: list, progress_callback=None) -> None:
+        """
+        Run an FFmpeg command, reading machine-readable progress from stdout
 
-            logger.info(f"Successfully created clip: {output_path}")
+        Args:
+            cmd: FFmpeg command
+            progress_callback: Optional callable receiving seconds of output encoded so far
 
-            return {
-                'success': True,
-                'output_path': output_path,
-                'duration': duration,
-                'crop_method': method_used,
-                'crop_position': crop_x,
-                'resolution': f"{target_width}x{target_height}"
-            }
+        Raises:
+            subprocess.CalledProcessError: with FFmpeg's stderr, on failure
+        """
+        cmd = self._progress_command(cmd)
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
 
-        except subprocess.CalledProcessError as e:
-            logger.error(f"FFmpeg error: {e.stderr}")
-            raise
+        # Drain stderr on its own thread so a burst of errors can't fill the
+        # pipe and stall FFmpeg while stdout is being read
+        stderr_chunks = []
+        drain = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+        drain.start()
+
+        for line in process.stdout:
+            self._report_progress(line, progress_callback)
+
+        returncode = process.wait()
+        drain.join()
+        if returncode:
+            raise subprocess.CalledProcessError(returncode, cmd, stderr=''.join(stderr_chunks))
+    
+    async def _run_ffmpeg_async(self, cmd: list, progress_callback=None) -> None:
+        """_run_ffmpeg as an asyncio subprocess"""
+        cmd = self._progress_command(cmd)
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+
+        # Read concurrently with stdout, for the same reason as in _run_ffmpeg
+        stderr_task = asyncio.ensure_future(process.stderr.read())
+
+        async for line in process.stdout:
+            self._report_progress(line.decode('utf-8', errors='replace'), progress_callback)
+
+        returncode = await process.wait()
+        stderr = (await stderr_task).decode('utf-8', errors='replace')
+        if returncode:
+            raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr)
     
     def _get_video_info(self, video_path: str) -> dict:
-        """Get video metadata using ffprobe"""
+        """Get video metadata using ffprobe (cached per path, and mtime for local files)"""
+        
+        # A local file can be re-downloaded under the same name between clips
+        try:
+            cache_key = (video_path, os.path.getmtime(video_path))
+        except OSError:
+            cache_key = (video_path, None)
+        if cache_key in self._info_cache:
+            return self._info_cache[cache_key]
         
+        # Only stream headers are needed, so keep ffprobe's read-ahead small
+        # (the defaults make it pull several seconds of a remote stream)
         cmd = [
             'ffprobe',
             '-v', 'error',
+            '-probesize', '500000',
+            '-analyzeduration', '100000',
             '-select_streams', 'v:0',
-            '-show_entries', 'stream=width,height,duration,bit_rate',
-            '-of', 'csv=p=0',
+            '-show_entries', 'stream=width,height,duration,bit_rate,r_frame_rate,codec_name',
+            '-of', 'json',
             video_path
         ]
         
@@ -168,14 +378,20 @@ class VideoProcessor:
                 check=True
             )
             
-            parts = result.stdout.strip().split(',')
+            # Fields ffprobe can't determine are left out of the JSON
+            stream = json_loads(result.stdout)['streams'][0]
+            num, _, den = stream.get('r_frame_rate', '0/1').partition('/')
             
-            return {
-                'width': int(parts[0]),
-                'height': int(parts[1]),
-                'duration': float(parts[2]) if len(parts) > 2 else 0,
-                'bit_rate': int(parts[3]) if len(parts) > 3 else 0
+            info = {
+                'width': int(stream['width']),
+                'height': int(stream['height']),
+                'duration': float(stream.get('duration', 0)),
+                'bit_rate': int(stream.get('bit_rate', 0)),
+                'fps': float(num) / float(den or 1) if float(den or 1) else 0,
+                'codec': stream.get('codec_name', '')
             }
+            self._info_cache[cache_key] = info
+            return info
             
         except Exception as e:
             logger.error(f"Error getting video info: {e}")
@@ -184,7 +400,8 @@ class VideoProcessor:
 
 # Example usage
 if __name__ == "__main__":
-    from config import TEMP_DIR, OUTPUT_DIR
+    from config import TEMP_DIR, OUTPUT_DIR, ensure_dirs
+    ensure_dirs()
     
     processor = VideoProcessor()
     